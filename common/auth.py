@@ -1,19 +1,35 @@
-from datetime import datetime, timedelta
+import time
+from datetime import timedelta
+from threading import Lock
 from typing import Annotated, Optional
-from fastapi import Depends
+from uuid import uuid4
+from cachetools import TLRUCache
+from fastapi import Depends, Request
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi.security import OAuth2PasswordBearer
 from common.exceptions import ForbiddenException, UnauthorizedException
 from data.models.user import User, UserResponse
-from data.database import insert_query, read_query
-from config import ACCESS_TOKEN_EXPIRE_MINUTES, ALGORITHM, SECRET_KEY
-from services.users_services import get_user
+from data.database import insert_query, read_one, read_query
+from config import ACCESS_TOKEN_EXPIRE_MINUTES, ALGORITHM, BCRYPT_ROUNDS, SECRET_KEY
+from services.users_services import USER_COLUMNS, get_user, invalidate_user
 
 
-pwd_context = CryptContext(schemes=['bcrypt'], deprecated='auto')
+pwd_context = CryptContext(schemes=['bcrypt'], deprecated='auto', bcrypt__rounds=BCRYPT_ROUNDS, bcrypt__ident='2b')
+# Load and self-test the bcrypt backend now instead of on the first login
+pwd_context.handler('bcrypt').get_backend()
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl='/api/users/login', auto_error=False)
-token_blacklist = set()
+
+# Payloads of tokens that already passed verification, each entry expires together with its token
+_token_cache = TLRUCache(maxsize=10_000, ttu=lambda token, payload, now: payload['exp'], timer=time.time)
+# Revoked token IDs mapped to the token's expiry. A revoked entry only has to outlive its token.
+_revoked_tokens = TLRUCache(maxsize=100_000, ttu=lambda jti, exp, now: exp, timer=time.time)
+_token_cache_lock = Lock()
+
+_EXPIRE_SECONDS = ACCESS_TOKEN_EXPIRE_MINUTES * 60
+_JWT_ALGS = (ALGORITHM,)
+# Every token we issue carries both claims, anything without them is rejected by jose itself
+_JWT_OPTIONS = {'require_exp': True, 'require_sub': True}
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -26,33 +42,69 @@ def get_password_hash(password: str) -> str:
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
-    expire = datetime.now() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({'exp': expire})
+    # exp is a UTC unix timestamp, so it can be built from time.time() directly
+    expire = int(time.time()) + (int(expires_delta.total_seconds()) if expires_delta else _EXPIRE_SECONDS)
+    to_encode.update({'exp': expire, 'jti': uuid4().hex})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
-def verify_token(token: str):
-    if token in token_blacklist:
-        raise ForbiddenException("Token has been revoked")
+def _decode_token(token: str) -> dict | None:
+    with _token_cache_lock:
+        payload = _token_cache.get(token)
+    if payload is not None:
+        return payload
+
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=_JWT_ALGS, options=_JWT_OPTIONS)
+    except JWTError:
+        return None
+
+    if not payload or payload.get('sub') is None:
+        return None
+
+    # Only successful decodes are cached, _JWT_OPTIONS guarantees they carry exp
+    with _token_cache_lock:
+        _token_cache[token] = payload
+
+    return payload
+
+
+def _revocation_key(token: str, payload: dict) -> str:
+    # Tokens issued before the jti claim was added are revoked by the token itself
+    return payload.get('jti') or token
+
 
+def verify_token(token: str):
     if not token:
         return None
 
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username = payload.get('sub') if payload else None
-        if username is None:
-            return None
-        return payload
-    except JWTError:
-            return None
+    payload = _decode_token(token)
+    if payload is None:
+        return None
+
+    with _token_cache_lock:
+        revoked = _revocation_key(token, payload) in _revoked_tokens
+    if revoked:
+        raise ForbiddenException("Token has been revoked")
+
+    return payload
+
+
+def revoke_token(token: str):
+    payload = _decode_token(token) if token else None
+    if payload is None: # Invalid or expired tokens are rejected anyway
+        return
+
+    with _token_cache_lock:
+        _revoked_tokens[_revocation_key(token, payload)] = payload['exp']
+
 
 def authenticate_user(username: str, password: str) -> Optional[UserResponse]:
-    user_data = read_query('SELECT * FROM users WHERE username=?', (username,))
+    user_data = read_one(f'SELECT {USER_COLUMNS} FROM users WHERE username = ? LIMIT 1', (username,))
 
-    if not user_data or not verify_password(password, user_data[0][2]):
+    if not user_data or not verify_password(password, user_data[2]):
         return None
-    return UserResponse.from_query_result(user_data[0])
+    return UserResponse.from_query_result(user_data)
 
 
 def get_current_user(token: str = Depends(oauth2_scheme)):
@@ -65,6 +117,11 @@ def get_current_user(token: str = Depends(oauth2_scheme)):
     return get_user(username)
 
 
+def get_current_user_from_cookie(request: Request):
+    # The web routes keep the token in a cookie rather than the Authorization header
+    return get_current_user(request.cookies.get('token'))
+
+
 def get_current_admin_user(user: User = Depends(get_current_user)):
     if not user.is_admin:
         raise ForbiddenException('You do not have permission to access this')
@@ -80,5 +137,7 @@ def hash_existing_user_passwords():
             hashed_password = get_password_hash(plain_password)
             
             insert_query('UPDATE users SET password = ? WHERE user_id = ?', (hashed_password, user_id))
+
+    invalidate_user()
     
     print("All user passwords have been hashed successfully.")
\ No newline at end of file
@@ -1,22 +1,37 @@
+import os
 from fastapi.templating import Jinja2Templates
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
 from common.auth import get_current_user
+from config import TEMPLATES_AUTO_RELOAD
 from services import categories_services, replies_services, users_services, votes_services
 
+# Next to the project rather than wherever the process was started, .gitignore keeps it out of the repo
+BYTECODE_CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.jinja_cache')
+
 class CustomJinja2Templates(Jinja2Templates):
     def __init__(self, directory: str):
-        super().__init__(directory=directory)
+        # Build the environment up front so compiled templates are kept in its cache
+        # and only re-checked on disk when auto reload is switched on for development.
+        # The bytecode cache lets a fresh process skip parsing templates it has compiled before.
+        os.makedirs(BYTECODE_CACHE_DIR, exist_ok=True)
+        env = Environment(
+            loader=FileSystemLoader(directory),
+            autoescape=True,
+            auto_reload=TEMPLATES_AUTO_RELOAD,
+            cache_size=-1,
+            bytecode_cache=FileSystemBytecodeCache(BYTECODE_CACHE_DIR)
+        )
+        super().__init__(env=env)
         self.env.globals['get_user'] = self.get_user_from_request
         self.env.globals['get_user_by_id'] = users_services.get_user_by_id
         self.env.globals['check_access'] = users_services.check_user_access_level
         self.env.globals['get_category_by_id'] = categories_services.get_by_id
         self.env.globals['get_reply_by_id'] = replies_services.get_reply_by_id
-        self.env.globals['is_list'] = self.is_list
         self.env.globals['get_votes'] = votes_services.get_votes
-        self.env.globals['has_voted'] = users_services.has_voted
 
         
     def get_user_from_request(self, request):
         return get_current_user(request.cookies.get('token'))
-    
-    def is_list(self, obj):
-        return isinstance(obj, list)
\ No newline at end of file
+
+
+templates = CustomJinja2Templates(directory="templates")
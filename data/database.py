@@ -1,10 +1,24 @@
-from mariadb import connect
+import logging
+import time
+from contextlib import contextmanager
+from threading import Lock
+from mariadb import ConnectionPool, PoolError
 from mariadb.connections import Connection
-from config import DB_USER, DB_PASSWORD, DB_HOST, DB_PORT, DB_NAME
+from config import DB_USER, DB_PASSWORD, DB_HOST, DB_PORT, DB_NAME, DB_POOL_SIZE, DB_POOL_TIMEOUT
 
 
-def _get_connection() -> Connection:
-    return connect(
+logger = logging.getLogger(__name__)
+
+
+_pool: ConnectionPool | None = None
+_pool_lock = Lock()
+
+# How long to sleep between attempts while every pooled connection is busy
+_POOL_RETRY_INTERVAL = 0.05
+
+
+def _connection_params() -> dict:
+    return dict(
         user=DB_USER,
         password=DB_PASSWORD,
         host=DB_HOST,
@@ -13,6 +27,53 @@ def _get_connection() -> Connection:
     )
 
 
+def init_pool() -> ConnectionPool:
+    global _pool
+
+    with _pool_lock:
+        if _pool is None:
+            _pool = ConnectionPool(
+                pool_name='forum',
+                pool_size=DB_POOL_SIZE,
+                pool_reset_connection=True,
+                **_connection_params()
+            )
+
+    return _pool
+
+
+def close_pool() -> None:
+    global _pool
+
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+
+def _get_connection() -> Connection:
+    pool = _pool if _pool is not None else init_pool()
+    deadline = time.monotonic() + DB_POOL_TIMEOUT
+
+    # Closing a pooled connection hands it back to the pool, so callers keep using 'with'.
+    # The threadpool runs more handlers than the pool has connections, so a busy pool is waited on
+    # rather than bypassed, that keeps the number of open connections at DB_POOL_SIZE.
+    while True:
+        try:
+            conn = pool.get_connection()
+        except PoolError:
+            conn = None
+
+        if conn is not None:
+            return conn
+
+        if time.monotonic() >= deadline:
+            logger.warning('No pooled database connection became free within %s seconds', DB_POOL_TIMEOUT)
+            raise PoolError(f'All {DB_POOL_SIZE} pooled database connections are busy')
+
+        time.sleep(_POOL_RETRY_INTERVAL)
+
+
 def read_query(sql: str, sql_params=()):
     with _get_connection() as conn:
         cursor = conn.cursor()
@@ -21,6 +82,24 @@ def read_query(sql: str, sql_params=()):
         return list(cursor)
 
 
+def read_one(sql: str, sql_params=()) -> tuple | None:
+    # For lookups that match at most one row, returns that row or None without building a list
+    with _get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(sql, sql_params)
+
+        return cursor.fetchone()
+
+
+def read_dict_query(sql: str, sql_params=()) -> list[dict]:
+    # Same as read_query, but every row comes back as a dict keyed by column name
+    with _get_connection() as conn:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(sql, sql_params)
+
+        return cursor.fetchall()
+
+
 def insert_query(sql: str, sql_params=()) -> int:
     with _get_connection() as conn:
         cursor = conn.cursor()
@@ -39,6 +118,21 @@ def update_query(sql: str, sql_params=()) -> bool:
         return True
 
 
+@contextmanager
+def transaction():
+    # Runs every statement executed on the yielded cursor on one connection and commits them together,
+    # any exception rolls all of them back
+    with _get_connection() as conn:
+        cursor = conn.cursor()
+
+        try:
+            yield cursor
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+
 def query_count(sql: str, sql_params=()):
     with _get_connection() as conn:
         cursor = conn.cursor()
@@ -0,0 +1,18 @@
+USE `forum` ;
+
+-- -----------------------------------------------------
+-- Columns and indexes for the reply and topic filters
+-- Safe to run against an existing database, each column and index is only created once
+-- -----------------------------------------------------
+
+-- Databases built from the original schema have no replies.created yet
+ALTER TABLE `forum`.`replies` ADD COLUMN IF NOT EXISTS `created` DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP AFTER `topic_id`;
+
+-- Replies of one topic in creation order, also covers topic_id on its own
+CREATE INDEX IF NOT EXISTS `replies_topic_created_idx` ON `forum`.`replies` (`topic_id` ASC, `created` ASC);
+
+-- start_date / end_date range filters
+CREATE INDEX IF NOT EXISTS `replies_created_idx` ON `forum`.`replies` (`created` ASC);
+
+-- topic_title filter on replies
+CREATE INDEX IF NOT EXISTS `topics_title_idx` ON `forum`.`topics` (`title` ASC);
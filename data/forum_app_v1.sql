@@ -80,6 +80,7 @@ CREATE TABLE IF NOT EXISTS `forum`.`topics` (
   INDEX `fk_topics_users1_idx` (`user_id` ASC) VISIBLE,
   INDEX `fk_topics_replies1_idx` (`best_reply_id` ASC) VISIBLE,
   INDEX `fk_topics_categories1_idx` (`category_id` ASC) VISIBLE,
+  INDEX `topics_title_idx` (`title` ASC) VISIBLE,
   CONSTRAINT `fk_topics_categories1`
     FOREIGN KEY (`category_id`)
     REFERENCES `forum`.`categories` (`category_id`)
@@ -107,10 +108,12 @@ CREATE TABLE IF NOT EXISTS `forum`.`replies` (
   `text` TEXT NOT NULL,
   `user_id` INT(11) NOT NULL,
   `topic_id` INT(11) NOT NULL,
+  `created` DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
   `edited` TINYINT(2) NOT NULL DEFAULT 0,
   PRIMARY KEY (`reply_id`),
   INDEX `fk_replies_users1_idx` (`user_id` ASC) VISIBLE,
-  INDEX `fk_replies_topics1_idx` (`topic_id` ASC) VISIBLE,
+  INDEX `replies_topic_created_idx` (`topic_id` ASC, `created` ASC) VISIBLE,
+  INDEX `replies_created_idx` (`created` ASC) VISIBLE,
   CONSTRAINT `fk_replies_topics1`
     FOREIGN KEY (`topic_id`)
     REFERENCES `forum`.`topics` (`topic_id`)
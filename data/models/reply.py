@@ -16,6 +16,12 @@ class Reply(BaseModel):
     def from_query_result(cls, id, text, user_id, topic_id, created, edited):
         return cls(id=id, text=text, user_id=user_id, topic_id=topic_id, created=created, edited=edited)
 
+    @classmethod
+    def from_row(cls, row: dict):
+        # Rows come from our own SELECTs, so validation is skipped. MariaDB returns edited as a TINYINT.
+        return cls.model_construct(id=row['reply_id'], text=row['text'], user_id=row['user_id'],
+                                   topic_id=row['topic_id'], created=row['created'], edited=bool(row['edited']))
+
 class ReplyResponse(BaseModel):
 
     id: int
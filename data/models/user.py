@@ -72,6 +72,15 @@ class UserResponse(BaseModel):
             is_admin= query_result[6],
         )
 
+    @classmethod
+    def from_rows(cls, rows):
+        # Bulk version of from_query_result for rows without the password column, skips validation
+        return [
+            cls.model_construct(id=row[0], username=row[1], email=row[2],
+                                first_name=row[3], last_name=row[4], is_admin=bool(row[5]))
+            for row in rows
+        ]
+
 class TokenResponse(BaseModel):
     access_token: str
     token_type: str
@@ -1,5 +1,7 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.exceptions import RequestValidationError
+from fastapi.responses import ORJSONResponse
 from fastapi.staticfiles import StaticFiles
 # from routers.admin import router as admin_router
 from routers.api.users import users_router
@@ -14,14 +16,21 @@ from routers.web.replies import router as web_replies_router
 from routers.web.home import router as home_router
 from routers.web.topics import router as web_topics_router
 from routers.web.users import router as web_users_router
-from common.template_config import CustomJinja2Templates
+from common.template_config import templates
+from data.database import close_pool, init_pool
 from starlette.exceptions import HTTPException as StarletteHTTPException
 from starlette.middleware.sessions import SessionMiddleware
 
 import uvicorn
 
-app = FastAPI()
-templates = CustomJinja2Templates(directory="templates")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    init_pool()
+    yield
+    close_pool()
+
+
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 app.add_middleware(SessionMiddleware, secret_key="secret")
 
 # app.include_router(admin_router)
@@ -22,7 +22,7 @@ def get_categories(category_id: Optional[int] = Query(default=None),
                    sort: Literal["asc", "desc",] | None = Query(default=None),
                    limit: int = Query(default=10, ge=1),
                    offset: int = Query(default=0, ge=0),
-                   current_user: User = Depends(common.auth.get_current_user)) -> List[CategoryResponse] | CategoryResponse:
+                   current_user: User = Depends(common.auth.get_current_user)) -> List[CategoryResponse]:
 
     if not current_user:
         raise ForbiddenException(detail='User not authenticated')
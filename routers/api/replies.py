@@ -24,7 +24,7 @@ def get_replies(reply_id: Optional[int] = Query(default=None),
                    start_date: Optional[datetime] = Query(default=None),
                    end_date: Optional[datetime] = Query(default=None),
                    limit: int = Query(default=10, ge=1),
-                   offset: int = Query(default=0, ge=0)) -> List[Reply] | Reply:
+                   offset: int = Query(default=0, ge=0)) -> List[Reply]:
 
     replies = replies_services.get_replies(reply_id=reply_id, text=text, user_name=user_name, user_id=user_id, topic_id=topic_id,
                                            topic_title=topic_title, sort_by=sort_by, sort=sort, start_date=start_date,
@@ -39,12 +39,12 @@ def get_replies(reply_id: Optional[int] = Query(default=None),
 @router.get('/{id}', response_model=Reply)
 def get_reply_by_id(reply_id: int):
       
-    reply = replies_services.get_replies(reply_id=reply_id)
+    replies = replies_services.get_replies(reply_id=reply_id)
                  
-    if not reply:
+    if not replies:
           raise NotFoundException(detail='Reply not found')
     
-    return reply
+    return replies[0]
     
 
 @router.post('/', response_model=Reply)
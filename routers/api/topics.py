@@ -60,8 +60,7 @@ def get_topic_by_id(topic_id: int):
     Returns:
     - Topic details and a list of replies.
     """
-    topic = topics_services.fetch_topic_by_id(topic_id)
-    replies_for_topic = topics_services.fetch_replies_for_topic(topic_id)
+    topic, replies_for_topic = topics_services.fetch_topic_with_replies(topic_id)
 
     if not topic:
         raise HTTPException(
@@ -125,7 +124,7 @@ def update_topic_best_reply(topic_id: int, current_user: UserAuthDep, topic_upda
     if not topic_update.best_reply_id:
         raise HTTPException(status_code=400, detail='No best reply id provided')
 
-    topic = topics_services.fetch_topic_by_id(topic_id)
+    topic, topic_replies = topics_services.fetch_topic_with_replies(topic_id)
 
     if not topic:
         raise HTTPException(status_code=404, detail='Topic does not exist')
@@ -133,12 +132,10 @@ def update_topic_best_reply(topic_id: int, current_user: UserAuthDep, topic_upda
     if not verify_topic_owner(current_user.id, topic_id):
         raise HTTPException(status_code=403, detail='You are not allowed to set the best reply for this topic')
 
-    topic_replies = topics_services.fetch_replies_for_topic(topic_id)
-
     if not topic_replies:
         raise HTTPException(status_code=404, detail='Topic does not have replies')
 
-    reply_ids = [reply[0] for reply in topic_replies]
+    reply_ids = [reply.id for reply in topic_replies]
 
     if topic_update.best_reply_id in reply_ids:
         return topics_services.update_best_reply_for_topic(topic_id, topic_update.best_reply_id)
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query, Response
 from fastapi.security import OAuth2PasswordRequestForm
 from common.exceptions import BadRequestException
 from data.models.user import User, UserLogin, UserResponse, TokenResponse
@@ -45,10 +45,15 @@ def get_current_user(user: User = Depends(auth.get_current_user)):
 @users_router.post('/logout')
 def lougout_user(token: str = Depends(oauth2_scheme)):
     auth.verify_token(token)
-    auth.token_blacklist.add(token)
+    auth.revoke_token(token)
     return 'Logged out successfully'
 
 
 @users_router.get('/', response_model=list[UserResponse])
-def get_all_users(admin: User = Depends(auth.get_current_admin_user)):
-    return users_services.get_users()
\ No newline at end of file
+def get_all_users(response: Response, limit: int = Query(default=100, ge=1), offset: int = Query(default=0, ge=0),
+                  include_total: bool = Query(default=False), admin: User = Depends(auth.get_current_admin_user)):
+    # Counting is a separate query, so the total is only sent when asked for
+    if include_total:
+        response.headers['X-Total-Count'] = str(users_services.count_users())
+
+    return users_services.get_users(limit=limit, offset=offset)
\ No newline at end of file
@@ -1,7 +1,7 @@
 import math
 from fastapi.responses import JSONResponse, RedirectResponse
 import common.auth
-from common.template_config import CustomJinja2Templates
+from common.template_config import templates
 from data.models.user import User
 from services import categories_services, users_services
 from fastapi import APIRouter, Depends, Request
@@ -12,7 +12,6 @@ from typing import Literal, Optional
 
 
 router = APIRouter(prefix='/categories', tags=['Categories'])
-templates = CustomJinja2Templates(directory="templates")
 
 @router.get('/create', response_model=None)
 def create_category_page(request: Request):
@@ -1,11 +1,10 @@
 from fastapi import APIRouter, Request
-from common.template_config import CustomJinja2Templates
+from common.template_config import templates
 import common.auth
 from services import topics_services
 
 
 router = APIRouter(prefix='', tags=['Homepage'])
-templates = CustomJinja2Templates(directory="templates")
 
 @router.get('/', response_model=None)
 def serve_homepage(request: Request = None):
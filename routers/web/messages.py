@@ -5,14 +5,13 @@ import json
 import uuid
 from fastapi import APIRouter, Request, WebSocket, WebSocketDisconnect
 from fastapi.responses import HTMLResponse
-from common.template_config import CustomJinja2Templates
+from common.template_config import templates
 from services import messages_services
 import common.auth
 
 
 
 router = APIRouter(prefix='/messages', tags=['Messages'])
-templates = CustomJinja2Templates(directory="templates")
 
 
 @dataclass
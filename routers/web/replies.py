@@ -1,8 +1,9 @@
 from typing import Optional, Literal
 from fastapi import APIRouter, Depends, Query, Request
 from fastapi.responses import RedirectResponse
+from starlette.concurrency import run_in_threadpool
 from common.exceptions import BadRequestException
-from common.template_config import CustomJinja2Templates
+from common.template_config import templates
 from data.models.reply import Reply, ReplyEdit, ReplyEditID
 from data.models.user import User
 from services import replies_services, topics_services, votes_services
@@ -12,7 +13,6 @@ import common.auth
 
 
 router = APIRouter(prefix='/replies', tags=['Replies'])
-templates = CustomJinja2Templates(directory="templates")
 
 @router.get('/', response_model=None)
 def get_replies(reply_id: Optional[int] = Query(default=None), 
@@ -27,7 +27,7 @@ def get_replies(reply_id: Optional[int] = Query(default=None),
                    end_date: Optional[datetime] = Query(default=None),
                    limit: int = Query(default=10, ge=1),
                    offset: int = Query(default=0, ge=0), request: Request = None,
-                   current_user: User = Depends(common.auth.get_current_user)):
+                   current_user: User = Depends(common.auth.get_current_user_from_cookie)):
     replies = replies_services.get_replies(reply_id=reply_id, text=text, user_name=user_name, user_id=user_id, topic_id=topic_id,
                                            topic_title=topic_title, sort_by=sort_by, sort=sort, start_date=start_date,
                                            end_date=end_date, limit=limit, offset=offset)
@@ -37,17 +37,19 @@ def get_replies(reply_id: Optional[int] = Query(default=None),
 
 
 @router.get('/{id}', response_model=Reply)
-def get_reply_by_id(reply_id: int, request: Request = None, current_user: User = Depends(common.auth.get_current_user)):
+def get_reply_by_id(reply_id: int, request: Request = None, current_user: User = Depends(common.auth.get_current_user_from_cookie)):
       
-    reply = replies_services.get_replies(reply_id=reply_id)
+    replies = replies_services.get_replies(reply_id=reply_id)
+    reply = replies[0] if replies else None
     
     return templates.TemplateResponse(name='single-reply.html', context={'reply': reply, 'user': current_user}, request=request)
     
 
 @router.post('/{reply_id}/vote', response_model=None)
-async def vote(request: Request, reply_id: int):
+async def vote(request: Request, reply_id: int, current_user: User = Depends(common.auth.get_current_user_from_cookie)):
 
-    current_user = common.auth.get_current_user(request.cookies.get('token'))
+    # This handler has to be async to await the form body, so the blocking database calls
+    # run in the threadpool, the sync user dependency is already resolved there by FastAPI
 
     if not current_user:
         return templates.TemplateResponse(name='error.html', context={'error': 'You must be logged in to vote'}, request=request)
@@ -57,7 +59,7 @@ async def vote(request: Request, reply_id: int):
     vote = True if vote == 1 else False
 
 
-    vote = votes_services.vote(reply_id=reply_id, type=vote, current_user=current_user)
+    vote = await run_in_threadpool(votes_services.vote, reply_id=reply_id, type=vote, current_user=current_user)
 
     referer = request.headers.get("referer")
                                     
@@ -76,16 +78,14 @@ async def vote(request: Request, reply_id: int):
 
 @router.patch('/', response_model=None)
 def edit_reply(old_reply: ReplyEditID, new_reply: ReplyEdit, 
-               current_user: User=Depends(common.auth.get_current_user), request: Request = None):
+               current_user: User=Depends(common.auth.get_current_user_from_cookie), request: Request = None):
 
 	edited = replies_services.edit_text(old_reply, new_reply, current_user)
 
 	return templates.TemplateResponse(name='single-reply.html', context={'reply': edited, 'user': current_user}, request=request)
 
 @router.delete('/{reply_id}/delete', response_model=None)
-def delete_reply(reply_id: int, request: Request):
-
-    current_user = common.auth.get_current_user(request.cookies.get('token'))
+def delete_reply(reply_id: int, request: Request, current_user: User = Depends(common.auth.get_current_user_from_cookie)):
 
     reply = replies_services.get_reply_by_id(reply_id=reply_id)
 
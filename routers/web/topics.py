@@ -1,6 +1,7 @@
 import re
 from fastapi import APIRouter, Body, HTTPException, Query, Request, Depends
 from fastapi.responses import RedirectResponse, JSONResponse
+from starlette.concurrency import run_in_threadpool
 # from data.models.category import Category
 from data.models.reply import ReplyCreateWeb
 from services import categories_services, replies_services, topics_services, users_services
@@ -9,12 +10,11 @@ import common.auth
 from common.exceptions import BadRequestException, ForbiddenException
 from data.models.topic import TopicCreate
 from services.topics_services import fetch_all_topics, verify_topic_owner
-from common.template_config import CustomJinja2Templates
+from common.template_config import templates
 from mariadb import IntegrityError
 
 
 router = APIRouter(prefix='/topics',tags=['Topics'])
-templates = CustomJinja2Templates(directory="templates")
 
 #WORKS
 @router.get('/create', response_model=None)
@@ -98,18 +98,20 @@ def get_topic_replies(
 
     token = request.cookies.get('token')
     
-    topic = topics_services.fetch_topic_by_id(topic_id)
+    topic, replies = topics_services.fetch_topic_with_replies(topic_id)
 
     if not topic:
         raise HTTPException(status_code=404, detail='Topic not found')
-    
-    replies = topics_services.fetch_replies_for_topic(topic_id)
+
+    # One query for the user's votes on the whole page instead of one per reply
+    votes = users_services.has_voted_many(current_user.id, [reply.id for reply in replies])
 
     return templates.TemplateResponse(
         name='single-topic.html',
         context={
             'topic': topic, 
             'replies': replies, 
+            'votes': votes,
             'current_user': current_user, 
             'token': token, 
             'request': request
@@ -177,7 +179,7 @@ async def update_topic_best_reply(
             context={'request': request, 'message': 'User not authorised'}
         )
 
-    topic = topics_services.fetch_topic_by_id(topic_id)
+    topic, topic_replies = topics_services.fetch_topic_with_replies(topic_id)
     if not topic:
         return templates.TemplateResponse(
             name='error.html',
@@ -190,7 +192,6 @@ async def update_topic_best_reply(
             context={'request': request, 'message': 'User not authorised'}
         )
 
-    topic_replies = topics_services.fetch_replies_for_topic(topic_id)
     if not topic_replies:
         return templates.TemplateResponse(
             name='topics.html',
@@ -265,7 +266,7 @@ def delete_topic(topic_id: int, request: Request = None):
 @router.post('/{topic_id}/create', response_model=None)
 async def create_reply(request: Request):
 
-    current_user = common.auth.get_current_user(request.cookies.get('token'))
+    current_user = await run_in_threadpool(common.auth.get_current_user, request.cookies.get('token'))
 
     reply_data = await request.form()
 
@@ -275,6 +276,6 @@ async def create_reply(request: Request):
 
     reply = ReplyCreateWeb(text=text, topic_id=topic_id, user_id=current_user.id)
 
-    reply = replies_services.create(reply, current_user)
+    reply = await run_in_threadpool(replies_services.create, reply, current_user)
      
     return RedirectResponse(url=f"/topics/{topic_id}", status_code=303)
\ No newline at end of file
@@ -3,12 +3,11 @@ from fastapi.responses import JSONResponse, RedirectResponse
 from fastapi.security import OAuth2PasswordRequestForm
 from common import auth
 from services import categories_services, users_services
-from common.template_config import CustomJinja2Templates
+from common.template_config import templates
 from data.models.user import UserRegistration
 
 
 router = APIRouter(prefix='/users', tags=['User'])
-templates = CustomJinja2Templates(directory="templates")
 
 
 @router.get('/{user_id}/permissions', response_model=None)
@@ -121,7 +120,7 @@ def login(form_data: OAuth2PasswordRequestForm = Depends(), request: Request = N
 @router.post('/logout')
 def logout(request: Request = None):
     token = request.cookies.get('token')
-    auth.token_blacklist.add(token)
+    auth.revoke_token(token)
     response = RedirectResponse(url='/', status_code=302)
     response.delete_cookie('token')
     return response
@@ -209,7 +208,7 @@ async def update_permissions(user_id: int, request: Request):
 
 
 @router.post('/update-profile', response_model=None)
-async def update_profile(
+def update_profile(
     request: Request,
     email: str = Form(...),
     first_name: str = Form(...),
@@ -218,6 +217,8 @@ async def update_profile(
     new_password: str = Form(None),
     confirm_password: str = Form(None)
 ):
+    # Kept sync so FastAPI runs it in the threadpool, hashing a new password with bcrypt
+    # would otherwise block the event loop
     current_user = auth.get_current_user(request.cookies.get('token'))
     
     if not current_user:
@@ -1,5 +1,11 @@
+from functools import partial
+from itertools import product
+from threading import Lock
+from cachetools import TTLCache, cached
+from cachetools.keys import hashkey
 from fastapi import Form
-from data.database import read_query, insert_query, update_query
+from data.database import read_query, insert_query, update_query, transaction
+from services import replies_services, topics_services
 from data.models.category import Category, CategoryChangeName, CategoryChangeNameID, CategoryCreate, CategoryResponse, CategoryResponseAdmin
 from typing import List
 from common.exceptions import ConflictException, ForbiddenException, NotFoundException, BadRequestException
@@ -7,10 +13,48 @@ from data.models.topic import TopicCategoryResponseAdmin
 from data.models.user import User
 
 
+# Category lookups keyed on (function name, args), every write clears them through invalidate()
+_category_cache = TTLCache(maxsize=10_000, ttl=60)
+_category_cache_lock = Lock()
+
+# (sort_by, sort) -> ORDER BY clause
+_CATEGORY_ORDER_CLAUSES = {
+    (column, sort): f''' ORDER BY c.{column}''' + (f' {sort.upper()}' if sort else '')
+    for column in ('name', 'category_id')
+    for sort in (None, 'asc', 'desc')
+}
+
+
+
+def _build_categories_query(is_admin: bool, by_id: bool, by_name: bool) -> str:
+
+    if is_admin:
+        # Admins can see both public and private categories
+        query = '''SELECT c.category_id, c.name, c.is_locked, c.is_private FROM categories c WHERE 1=1'''
+    else:
+        # Non-admin users can see public categories (is_private = 0)
+        # and private categories where they have access (access_level > 0)
+        query = '''SELECT c.category_id, c.name FROM categories c'''
+        query += ''' LEFT JOIN users_categories_permissions ucp ON c.category_id = ucp.category_id and ucp.user_id = ?'''
+        query += ''' WHERE (c.is_private = 0 OR (c.is_private = 1 AND ucp.write_access > 0))'''
+
+    if by_id:
+        query += ''' AND c.category_id = ?'''
+
+    if by_name:
+        query += ''' AND c.name LIKE ?'''
+
+    return query
+
+
+# (is_admin, filter by id, filter by name) -> query, built once at import for every combination
+_CATEGORY_QUERIES = {key: _build_categories_query(*key) for key in product((False, True), repeat=3)}
+
+
 def get_categories(current_user: User, 
                    category_id: int = None, name: str = None, 
                    sort_by: str = None, sort: str = None,
-                   limit: int = 10, offset: int = 0,) -> CategoryResponse | List[CategoryResponse] | None:
+                   limit: int = 10, offset: int = 0,) -> List[CategoryResponse] | List[CategoryResponseAdmin]:
     
     """
     Retrieve categories from the database with optional filtering, sorting, and pagination.
@@ -24,48 +68,29 @@ def get_categories(current_user: User,
         offset (int, optional): Number of rows to skip before starting to return rows. Defaults to 0.
 
     Returns:
-        CategoryResponse | List[CategoryResponse] | None: A single CategoryResponse if one result is found,
-        a list of CategoryResponse objects if multiple results are found, or None if no results are found.
+        List[CategoryResponse] | List[CategoryResponseAdmin]: The matching categories, empty if none are found.
+        Admins get CategoryResponseAdmin objects that include the lock and privacy flags.
     """
     
-    query = '''SELECT c.category_id, c.name, c.is_locked, c.is_private FROM categories c ''' if current_user.is_admin else '''SELECT c.category_id, c.name FROM categories c'''
-    params = []
-
-    if not current_user.is_admin:
-        # Non-admin users can see public categories (is_private = 0)
-        # and private categories where they have access (access_level > 0)
-        query += ''' LEFT JOIN users_categories_permissions ucp ON c.category_id = ucp.category_id and ucp.user_id = ?'''
-        query += ''' WHERE (c.is_private = 0 OR (c.is_private = 1 AND ucp.write_access > 0))'''
-        params.append(current_user.id)
-    else:
-        # Admins can see both public and private categories
-        query += ''' LEFT JOIN users_categories_permissions ucp ON c.category_id = ucp.category_id AND ucp.user_id = ?'''
-        params.append(current_user.id)
+    query = _CATEGORY_QUERIES[(bool(current_user.is_admin), bool(category_id), bool(name))]
+    params = [] if current_user.is_admin else [current_user.id]
 
     if category_id:
-        query += ''' AND c.category_id = ?'''
         params.append(category_id)
 
     if name:
-        query += ''' AND c.name LIKE ?'''
         params.append(f'%{name}%')
 
-    if sort_by:
-        query += f''' ORDER BY {sort_by}'''
-
-    if sort:
-        query += f" {sort.upper()}"
+    query += _CATEGORY_ORDER_CLAUSES.get((sort_by, sort.lower() if sort else None), '')
 
     query += ''' LIMIT ? OFFSET ?'''
     params.extend([limit, offset])
 
     categories = read_query(query, tuple(params)) 
 
-    if len(categories) > 1:  # Return a list of objects if more than one instance is found
-        return [CategoryResponseAdmin.from_query_result(*obj) for obj in categories] if current_user.is_admin else [CategoryResponse.from_query_result(*obj) for obj in categories]
-    
-    else:  # Otherwise return a single object
-        return next((CategoryResponseAdmin.from_query_result(*row) for row in categories), None) if current_user.is_admin else next((CategoryResponse.from_query_result(*row) for row in categories), None)
+    model = CategoryResponseAdmin if current_user.is_admin else CategoryResponse
+
+    return [model.from_query_result(*row) for row in categories]
     
 
 def create(category: CategoryCreate) -> Category | None:
@@ -88,25 +113,43 @@ def create(category: CategoryCreate) -> Category | None:
     
     generated_id = insert_query('''INSERT INTO categories (name, is_locked, is_private) VALUES (?, ?, ?)''',
                                  (category.name, category.is_locked, category.is_private))
+    invalidate()
 
     return Category(id=generated_id, name=category.name, is_locked=category.is_locked, is_private=category.is_private) if generated_id else None
     
 
 def exists(category_id: int = None, name: str = None) -> bool:
-    
-    category = None
 
     if category_id: # If an id is provided, check the database for the id
-        category = read_query('''SELECT category_id FROM categories WHERE category_id = ?
-                            LIMIT 1''', (category_id,))
+        return _exists_cached(category_id, None)
     
     elif name: # Or if a name is provided, check the database for the name
+        return _exists_cached(None, name)
+    
+    return False
+
+
+@cached(_category_cache, key=partial(hashkey, 'exists'), lock=_category_cache_lock)
+def _exists_cached(category_id: int | None, name: str | None) -> bool:
+
+    if category_id:
+        category = read_query('''SELECT category_id FROM categories WHERE category_id = ?
+                            LIMIT 1''', (category_id,))
+
+    else:
         category = read_query('''SELECT category_id FROM categories WHERE name = ?
                             LIMIT 1''', (name,))
-    
+
     return bool(category)
 
 
+def invalidate() -> None:
+
+    # Lookups by name and by id share entries, so every write to the categories table clears them all
+    with _category_cache_lock:
+        _category_cache.clear()
+
+
 def delete(category_id: int, delete_topics: bool = False) ->  str | None:
     
     """
@@ -126,37 +169,33 @@ def delete(category_id: int, delete_topics: bool = False) ->  str | None:
     if not exists(category_id=category_id):
         raise NotFoundException(detail='Category does not exist')
     
-    # Fist delete the category from users_categories_permission table
-    update_query('''DELETE FROM users_categories_permissions WHERE category_id = ?''', (category_id,))
+    delete_everything = delete_topics and has_topics(category_id)
 
-    topics = has_topics(category_id)
+    # All statements run in one transaction, so a failure leaves the category and its permissions intact
+    with transaction() as cursor:
 
-    delete_from_replies = None
-    delete_from_topics = None
-    
-    if delete_topics and topics: # If delete topics was selected, check if any exist and then delete them
+        # Fist delete the category from users_categories_permission table
+        cursor.execute('''DELETE FROM users_categories_permissions WHERE category_id = ?''', (category_id,))
 
-        remove_best_replies = update_query('''UPDATE topics SET best_reply_id = NULL WHERE category_id = ?''', (category_id,))
+        if delete_everything: # If delete topics was selected and the category has any, delete them with their replies
 
-        delete_from_replies = update_query('''DELETE FROM replies
-                        WHERE topic_id IN (SELECT t.topic_id 
-                        FROM topics t 
-                        WHERE t.category_id = ?)''', (category_id,))
-        
-        delete_from_topics = update_query('''DELETE FROM topics WHERE category_id = ?''', (category_id,))
+            cursor.execute('''UPDATE topics SET best_reply_id = NULL WHERE category_id = ?''', (category_id,))
 
-    # Finally delete the category itself
-    deleted = update_query('''DELETE FROM categories WHERE category_id = ?''', (category_id,))
+            cursor.execute('''DELETE FROM replies
+                            WHERE topic_id IN (SELECT t.topic_id 
+                            FROM topics t 
+                            WHERE t.category_id = ?)''', (category_id,))
+            
+            cursor.execute('''DELETE FROM topics WHERE category_id = ?''', (category_id,))
 
-    if not deleted:
-        return None
-    
-    else:
+        # Finally delete the category itself
+        cursor.execute('''DELETE FROM categories WHERE category_id = ?''', (category_id,))
 
-        if delete_from_replies and delete_from_topics:
-            return 'everything deleted' 
-    
-        return 'only category deleted'
+    invalidate()
+    topics_services.invalidate() # Cached topics and replies may belong to the deleted category
+    replies_services.invalidate()
+
+    return 'everything deleted' if delete_everything else 'only category deleted'
     
 
 def update_name(old_category: CategoryChangeNameID, new_category: CategoryChangeName) -> CategoryResponse | None:
@@ -200,6 +239,9 @@ def update_name(old_category: CategoryChangeNameID, new_category: CategoryChange
         params.append(old_category.name)
 
     updated = update_query(query, tuple(params))
+    invalidate()
+    topics_services.invalidate() # Cached topics carry the category name
+    replies_services.invalidate()
 
     merged = CategoryResponse(id=get_id(new_category.name), name=new_category.name or old_category.name)
 
@@ -215,6 +257,12 @@ def has_topics(category_id: int) -> bool:
 
 def get_name(category_id: int) -> str:
 
+    return _get_name_cached(category_id)
+
+
+@cached(_category_cache, key=partial(hashkey, 'get_name'), lock=_category_cache_lock)
+def _get_name_cached(category_id: int) -> str:
+
     name = read_query('''SELECT name FROM categories WHERE category_id = ? LIMIT 1''', (category_id,))
 
     return name[0][0]
@@ -222,6 +270,12 @@ def get_name(category_id: int) -> str:
 
 def get_id(name: str) -> int:
 
+    return _get_id_cached(name)
+
+
+@cached(_category_cache, key=partial(hashkey, 'get_id'), lock=_category_cache_lock)
+def _get_id_cached(name: str) -> int:
+
     id = read_query('''SELECT category_id FROM categories WHERE name = ? LIMIT 1''', (name,))
 
     return id[0][0]
@@ -252,6 +306,7 @@ def lock_unlock(category_id: int) -> str | None:
     if is_locked(category_id): # If the category is already locked, unlock it
 
         unlock_category = update_query('''UPDATE categories SET is_locked = ? WHERE category_id = ?''', (False, category_id))
+        invalidate()
 
         if not unlock_category:
             return 'unlock failed'
@@ -260,6 +315,7 @@ def lock_unlock(category_id: int) -> str | None:
 
     else: # Otherwise, lock it
         lock_category = update_query('''UPDATE categories SET is_locked = ? WHERE category_id = ?''', (True, category_id))
+        invalidate()
 
         if not lock_category:
             return 'lock failed'
@@ -269,6 +325,12 @@ def lock_unlock(category_id: int) -> str | None:
 
 def is_locked(category_id: int) -> bool:
 
+    return _is_locked_cached(category_id)
+
+
+@cached(_category_cache, key=partial(hashkey, 'is_locked'), lock=_category_cache_lock)
+def _is_locked_cached(category_id: int) -> bool:
+
     locked_row = read_query('''SELECT is_locked FROM categories WHERE category_id = ? LIMIT 1''', (category_id,))
 
     locked_bool = locked_row[0][0]
@@ -278,6 +340,12 @@ def is_locked(category_id: int) -> bool:
 
 def is_private(category_id: int) -> bool:
 
+    return _is_private_cached(category_id)
+
+
+@cached(_category_cache, key=partial(hashkey, 'is_private'), lock=_category_cache_lock)
+def _is_private_cached(category_id: int) -> bool:
+
     private_row = read_query('''SELECT is_private FROM categories WHERE category_id = ? LIMIT 1''', (category_id,))
 
     private_bool = private_row[0][0]
@@ -306,6 +374,7 @@ def privatise_unprivatise(category_id: int) -> str | None:
     if is_private(category_id): # If the category is already private, make it public
             
             make_public = update_query('''UPDATE categories SET is_private = ? WHERE category_id = ?''', (False, category_id))
+            invalidate()
     
             if not make_public:
                 return 'made public failed'
@@ -315,6 +384,7 @@ def privatise_unprivatise(category_id: int) -> str | None:
     else: # Otherwise, make it private
     
         make_private = update_query('''UPDATE categories SET is_private = ? WHERE category_id = ?''', (True, category_id))
+        invalidate()
     
         if not make_private:
             return 'made private failed'
@@ -404,6 +474,7 @@ def post_topic(category_id: int, title: str, user: User) -> int:
         raise ForbiddenException(detail='You do not have permission to access this resource')
     
     topic_id = insert_query("INSERT INTO topics (category_id, title, user_id) VALUES (?, ?, ?)", (category_id, title, user.id))
+    topics_services.invalidate(topic_id)
     return topic_id
 
 
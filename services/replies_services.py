@@ -1,16 +1,68 @@
 from datetime import datetime
+from threading import Lock
+from cachetools import TTLCache, cached
+from cachetools.keys import hashkey
 from fastapi import Form
-from data.database import read_query, insert_query, update_query
+from data.database import read_query, read_dict_query, insert_query, update_query
 from data.models.reply import Reply, ReplyCreate, ReplyCreateWeb, ReplyResponse
 from typing import List
 from common.exceptions import ForbiddenException, NotFoundException
 from data.models.user import User
 
 
+# Single replies looked up by ID, mostly from the templates
+_reply_cache = TTLCache(maxsize=10_000, ttl=30)
+_reply_cache_lock = Lock()
+
+# Filter name -> WHERE fragment, in the order their parameters are bound
+_REPLY_FILTERS = {
+    'reply_id': ''' AND r.reply_id = ?''',
+    'text': ''' AND r.text LIKE ?''',
+    'user_id': ''' AND r.user_id = ?''',
+    'user_name': ''' AND u.username = ?''',
+    'topic_id': ''' AND r.topic_id = ?''',
+    'topic_title': ''' AND t.title = ?''',
+    'start_date': ''' AND r.created > ?''',
+    'end_date': ''' AND r.created < ?''',
+}
+
+# Unlisted sort columns are not sorted on, so sort_by never reaches the SQL
+_REPLY_ORDER_CLAUSES = {
+    (column, sort): f''' ORDER BY r.{column}''' + (f' {sort.upper()}' if sort else '')
+    for column in ('user_id', 'topic_id', 'created')
+    for sort in (None, 'asc', 'desc')
+}
+
+
+def _build_replies_query(mask: int) -> str:
+
+    # Bit i of the mask switches on the i-th filter of _REPLY_FILTERS
+    active_filters = [name for bit, name in enumerate(_REPLY_FILTERS) if mask >> bit & 1]
+
+    query = '''SELECT r.reply_id, r.text, r.user_id, r.topic_id, r.created, r.edited FROM replies r'''
+
+    if 'user_name' in active_filters: # Only join the tables that a filter actually needs
+        query += ''' JOIN users u ON u.user_id = r.user_id'''
+
+    if 'topic_title' in active_filters:
+        query += ''' JOIN topics t ON t.topic_id = r.topic_id'''
+
+    query += ''' WHERE 1=1'''
+
+    for name in active_filters:
+        query += _REPLY_FILTERS[name]
+
+    return query
+
+
+# Every combination of filters is known up front, so all of their queries are built once at import
+_REPLIES_QUERY_BY_MASK = [_build_replies_query(mask) for mask in range(1 << len(_REPLY_FILTERS))]
+
+
 def get_replies(reply_id: int = None, text: str = None, user_id: int = None, user_name: str = None,
                 topic_id: int = None, topic_title: str = None, sort_by: str = None, sort: str = None,
                 start_date: datetime = None, end_date: datetime = None, limit: int = 10,
-                offset: int = 0) -> List[Reply] | Reply | None:
+                offset: int = 0) -> List[Reply]:
     
     """
     Retrieve replies from the database based on various filters and sorting options.
@@ -30,60 +82,33 @@ def get_replies(reply_id: int = None, text: str = None, user_id: int = None, use
         offset (int, optional): Offset for pagination. Defaults to 0.
 
     Returns:
-        List[Reply] | Reply | None: A list of Reply objects if multiple replies are found,
-                                    a single Reply object if only one reply is found,
-                                    or None if no replies match the criteria.
+        List[Reply]: The matching replies, empty if none match the criteria.
     """
 
-    query = '''SELECT reply_id, text, user_id, topic_id, created, edited FROM replies WHERE 1=1'''
-    params = []
-
-    if reply_id:
-        query += ''' AND reply_id = ?'''
-        params.append(reply_id)
-
-    if text:
-        query += ''' AND text LIKE ?'''
-        params.append(f'%{text}%')
-
-    if user_id or user_name:
-        user_id_row = read_query('''SELECT u.user_id FROM users u JOIN replies r ON u.user_id = r.user_id WHERE u.username = ? LIMIT 1''', (user_name,)) if user_name else None
-        user_id = user_id_row[0][0] if user_id_row else user_id
-        query += ''' AND user_id = ?'''
-        params.append(user_id)
-
-    if topic_id or topic_title:
-        topic_id_row = read_query('''SELECT t.topic_id FROM topics t 
-                                  JOIN replies r ON t.topic_id = r.topic_id 
-                                  WHERE t.title = ? LIMIT 1''', (topic_title,)) if topic_title else None
-        topic_id = topic_id_row[0][0] if topic_id_row else topic_id
-        query += ''' AND topic_id = ?'''
-        params.append(topic_id)
+    filter_values = {
+        'reply_id': reply_id,
+        'text': f'%{text}%' if text else None,
+        'user_id': user_id,
+        'user_name': user_name,
+        'topic_id': topic_id,
+        'topic_title': topic_title,
+        'start_date': start_date,
+        'end_date': end_date,
+    }
 
-    if start_date:
-        query += ''' AND created > ?'''
-        params.append(start_date)
+    # filter_values is in the same order as _REPLY_FILTERS, so the params line up with the query
+    params = [value for value in filter_values.values() if value]
+    mask = sum(1 << bit for bit, value in enumerate(filter_values.values()) if value)
 
-    if end_date:
-        query += ''' AND created < ?'''
-        params.append(end_date)
-
-    if sort_by:
-        query += f''' ORDER BY {sort_by}'''
-
-        if sort:
-            query += f''' {sort.upper()}'''
+    query = _REPLIES_QUERY_BY_MASK[mask]
 
+    query += _REPLY_ORDER_CLAUSES.get((sort_by, sort.lower() if sort else None), '')
     query += ''' LIMIT ? OFFSET ?'''
     params.extend([limit, offset])
 
-    replies = read_query(query, tuple(params))
-
-    if len(replies) > 1: # If more than one instances are found, return a list of objects
-        return [Reply.from_query_result(*obj) for obj in replies]
+    replies = read_dict_query(query, tuple(params))
 
-    else: # Otherwise return a single object
-        return next((Reply.from_query_result(*row) for row in replies), None)
+    return [Reply.from_row(row) for row in replies]
     
 
 def create(reply: ReplyCreate, current_user: User) -> Reply | None:
@@ -111,6 +136,7 @@ def create(reply: ReplyCreate, current_user: User) -> Reply | None:
     
     generated_id = insert_query('''INSERT INTO replies (text, user_id, topic_id) VALUES (?, ?, ?)''',
                                 (reply.text, user_id, reply.topic_id))
+    invalidate(generated_id) # A lookup before the insert may have cached None for this ID
 
     return Reply(id=generated_id, text=reply.text, user_id=user_id, topic_id=reply.topic_id) if generated_id else None
 
@@ -149,6 +175,7 @@ def edit_text(old_reply: ReplyResponse, new_reply: ReplyResponse, current_user:
 
     edited = update_query('''UPDATE replies SET text = ?, edited = ?
                        WHERE reply_id = ?''', (merged.text, True, old_reply.id))
+    invalidate(old_reply.id)
     
     return merged if (merged and edited) else None
 
@@ -188,6 +215,7 @@ def delete(reply_id: int, current_user: User) -> str | None:
             raise ForbiddenException(detail='You are not allowed to delete this reply')
     
     deleted = update_query('''DELETE FROM replies WHERE reply_id = ?''', (reply_id,))
+    invalidate(reply_id)
     
     return 'reply deleted' if deleted else None
 
@@ -199,11 +227,22 @@ def fetch_text(reply_id: int) -> str:
     return str(reply_text_row[0][0])
 
 
+# Keyed on the ID alone, so positional and keyword calls share an entry that invalidate() can find
+@cached(_reply_cache, key=lambda reply_id: hashkey(reply_id), lock=_reply_cache_lock)
 def get_reply_by_id(reply_id: int) -> Reply | None:
 
-    reply = read_query('''SELECT reply_id, text, user_id, topic_id, created, edited FROM replies WHERE reply_id = ? LIMIT 1''', (reply_id,))
+    reply = read_dict_query('''SELECT reply_id, text, user_id, topic_id, created, edited FROM replies WHERE reply_id = ? LIMIT 1''', (reply_id,))
+
+    return Reply.from_row(reply[0]) if reply else None
+
+
+def invalidate(reply_id: int | None = None):
 
-    return Reply.from_query_result(*reply[0]) if reply else None
+    with _reply_cache_lock:
+        if reply_id is None:
+            _reply_cache.clear()
+        else:
+            _reply_cache.pop(hashkey(reply_id), None)
 
 
 def reply_create_form(text: str = Form(...)) -> ReplyCreateWeb:
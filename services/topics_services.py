@@ -1,9 +1,14 @@
 from __future__ import annotations
+from functools import partial
+from threading import Lock
+from cachetools import TTLCache, cached
+from cachetools.keys import hashkey
 from fastapi import Form, HTTPException
 from pydantic import ValidationError
 from data.models.reply import Reply
 from data.models.topic import TopicResponse, TopicCreate
-from data.database import read_query, update_query, insert_query
+from data.database import read_one, read_query, read_dict_query, update_query, insert_query, transaction
+from services import replies_services
 import logging
 
 from data.models.user import User
@@ -13,13 +18,31 @@ logging.basicConfig(level=logging.INFO)
 
 DEFAULT_BEST_REPLY_NONE = None
 
+# Lookups keyed on (function name, topic_id). Writes in this process evict through invalidate(),
+# the TTL bounds how stale another worker process can get. The category, reply and user caches work the same way
+_topic_cache = TTLCache(maxsize=10_000, ttl=30)
+_topic_cache_lock = Lock()
+
+# Permission checks tolerate a few seconds of staleness, writers still evict their topic
+_topic_access_cache = TTLCache(maxsize=4096, ttl=5)
+_topic_access_cache_lock = Lock()
+
+# (sort_by, sort) -> ORDER BY clause, 'status' sorts on the lock flag
+_TOPIC_ORDER_CLAUSES = {
+    (sort_by, sort): f' ORDER BY {column} {sort.upper()}'
+    for sort_by, column in (('topic_id', 't.topic_id'), ('user_id', 't.user_id'),
+                            ('category_id', 't.category_id'), ('status', 't.is_locked'))
+    for sort in ('asc', 'desc')
+}
+
 
 #WORKS
-def exists(topic_id: int):
+@cached(_topic_cache, key=partial(hashkey, 'exists'), lock=_topic_cache_lock)
+def exists(topic_id: int) -> bool:
     """
     Checks if a topic with the provided ID exists.
     """
-    return any(read_query('''SELECT 1 FROM topics WHERE topic_id=?''', (id,)))
+    return bool(read_query('''SELECT 1 FROM topics WHERE topic_id = ? LIMIT 1''', (topic_id,)))
 
 
 #WORKS
@@ -45,21 +68,21 @@ def fetch_all_topics(
     """
     params, filters = [], []
     sql = (
-        '''SELECT DISTINCT t.topic_id, t.title, t.user_id, u.username, t.is_locked, 
-           t.best_reply_id, t.category_id, c.name
+        '''SELECT t.topic_id, t.title, t.user_id, u.username, t.is_locked, 
+           t.best_reply_id, t.category_id, c.name, COUNT(*) OVER () AS total_count
         FROM topics t
         JOIN users u ON t.user_id = u.user_id
-        JOIN categories c ON t.category_id = c.category_id
-        LEFT JOIN users_categories_permissions ucp ON ucp.category_id = c.category_id AND ucp.user_id = ?'''
+        JOIN categories c ON t.category_id = c.category_id'''
     )
 
     if not current_user:
         return None
-    
-    params.append(current_user.id)
 
     if not current_user.is_admin:
-        filters.append('(c.is_private = 0 or (c.is_private = 1 AND ucp.write_access > 0))')
+        # A semi-join never multiplies topic rows, so no DISTINCT pass is needed
+        filters.append('''(c.is_private = 0 OR EXISTS (SELECT 1 FROM users_categories_permissions ucp
+                          WHERE ucp.category_id = c.category_id AND ucp.user_id = ? AND ucp.write_access > 0))''')
+        params.append(current_user.id)
 
     if search:
         filters.append('t.title LIKE ?')
@@ -77,21 +100,28 @@ def fetch_all_topics(
 
     sql += (" WHERE " + " AND ".join(filters) if filters else "")
 
-    # Get total count for pagination
+    # Only needed when the requested page is past the last row, see below
     count_sql = f"SELECT COUNT(*) FROM ({sql}) as count_table"
-    total_count = read_query(count_sql, tuple(params))[0][0]
-    total_pages = (total_count + per_page - 1) // per_page
+    count_params = tuple(params)
 
     # Add sorting and pagination
-    if sort_by and sort_by in ['topic_id', 'user_id', 'category_id', 'status']:
-        order = "ASC" if sort == "asc" else "DESC"
-        sql += f' ORDER BY {sort_by} {order}'
+    sql += _TOPIC_ORDER_CLAUSES.get((sort_by, 'asc' if sort == 'asc' else 'desc'), '')
     
     sql += ' LIMIT ? OFFSET ?'
     params.extend([per_page, (page - 1) * per_page])
 
     data = read_query(sql, tuple(params))
-    topics = [TopicResponse.from_query(*row) for row in data]
+
+    # The total number of matching topics comes back as the last column of every row
+    if data:
+        total_count = data[0][-1]
+    elif page > 1: # A page past the end has no rows to read the total from
+        total_count = read_query(count_sql, count_params)[0][0]
+    else:
+        total_count = 0
+
+    total_pages = (total_count + per_page - 1) // per_page
+    topics = [TopicResponse.from_query(*row[:-1]) for row in data]
 
     return {
         'topics': topics,
@@ -101,12 +131,30 @@ def fetch_all_topics(
     }
 
 
+def invalidate(topic_id: int | None = None):
+    """
+    Drops the cached lookups for a topic, or for every topic if no ID is given.
+    """
+    with _topic_cache_lock:
+        if topic_id is None:
+            _topic_cache.clear()
+        else:
+            _topic_cache.pop(hashkey('exists', topic_id), None)
+            _topic_cache.pop(hashkey('fetch_topic_by_id', topic_id), None)
+    with _topic_access_cache_lock:
+        if topic_id is None:
+            _topic_access_cache.clear()
+        else:
+            _topic_access_cache.pop(hashkey(topic_id), None)
+
+
 #WORKS
+@cached(_topic_cache, key=partial(hashkey, 'fetch_topic_by_id'), lock=_topic_cache_lock)
 def fetch_topic_by_id(topic_id: int) -> TopicResponse | None:
     '''
-    Fetches a topic by its ID and returns a TopicResponse object with all the replies.
+    Fetches a topic by its ID and returns a TopicResponse object, replies are not included.
     '''
-    data = read_query(
+    row = read_one(
         '''SELECT t.topic_id, t.title, t.user_id, u.username, t.is_locked, t.best_reply_id, t.category_id, c.name
          FROM topics t
          JOIN users u ON t.user_id = u.user_id
@@ -114,7 +162,36 @@ def fetch_topic_by_id(topic_id: int) -> TopicResponse | None:
          WHERE t.topic_id = ?''', (topic_id,)
     )
 
-    return next((TopicResponse.from_query(*row) for row in data), None)
+    return TopicResponse.from_query(*row) if row else None
+
+
+def fetch_topic_with_replies(topic_id: int) -> tuple[TopicResponse | None, list[Reply]]:
+    '''
+    Fetches a topic together with all of its replies in a single query.
+    Returns a (topic, replies) tuple, topic is None if the topic does not exist.
+    '''
+    # t.topic_id doubles as the reply's topic_id, the topic author is aliased so r.user_id keeps its name
+    data = read_dict_query(
+        '''SELECT t.topic_id, t.title, t.user_id AS author_id, u.username, t.is_locked, t.best_reply_id,
+                  t.category_id, c.name AS category_name, r.reply_id, r.text, r.user_id, r.created, r.edited
+         FROM topics t
+         JOIN users u ON t.user_id = u.user_id
+         JOIN categories c ON t.category_id = c.category_id
+         LEFT JOIN replies r ON r.topic_id = t.topic_id
+         WHERE t.topic_id = ?
+         ORDER BY r.reply_id''', (topic_id,)
+    )
+
+    if not data:
+        return None, []
+
+    # Every row repeats the topic columns, the reply columns are NULL when the topic has no replies
+    first = data[0]
+    topic = TopicResponse.from_query(first['topic_id'], first['title'], first['author_id'], first['username'],
+                                     first['is_locked'], first['best_reply_id'], first['category_id'], first['category_name'])
+    replies = [Reply.from_row(row) for row in data if row['reply_id'] is not None]
+
+    return topic, replies
 
 
 #WORKS
@@ -142,6 +219,8 @@ def create_new_topic(topic: TopicCreate, user_id: int):
         if not topic_id:
             raise HTTPException(status_code=500, detail="Topic creation failed")
 
+        invalidate(topic_id)
+
         reply_id = insert_query(
             '''INSERT INTO replies(text, user_id, topic_id, edited) 
                VALUES(?,?,?,?)''',
@@ -167,6 +246,7 @@ def update_topic_title(topic_id: int, new_title: str):
     Updates the title of a topic.
     """
     update_query('''UPDATE topics SET title = ? WHERE topic_id = ?''', (new_title, topic_id))
+    invalidate(topic_id)
 
     return f"Topic {topic_id} title updated to {new_title}"
 
@@ -177,38 +257,34 @@ def update_best_reply_for_topic(topic_id: int, reply_id: int):
     Updates the best reply for a topic.
     """
     update_query('''UPDATE topics SET best_reply_id = ? WHERE topic_id = ?''', (reply_id, topic_id))
+    invalidate(topic_id)
 
     return f"Best reply for topic {topic_id} updated to {reply_id}"
 
 
-#WORKS
-def fetch_replies_for_topic(topic_id: int):
+@cached(_topic_access_cache, lock=_topic_access_cache_lock)
+def _topic_access_row(topic_id: int) -> tuple | None:
     """
-    Fetches all replies for a specific topic.
+    Fetches only the owner and lock flag of a topic, or None if it does not exist.
     """
-    data = read_query(
-        '''SELECT r.reply_id, r.text, r.user_id, r.topic_id, r.created, r.edited
-        FROM replies r
-        WHERE r.topic_id = ?''',
-        (topic_id,)
-    )
-    
-    return [Reply.from_query_result(*row) for row in data]
-# korekcii gore.
+    return read_one('''SELECT user_id, is_locked FROM topics WHERE topic_id = ?''', (topic_id,))
+
 
 #WORKS
-def check_topic_access_permissions(user_id: int, topic_id: input):
+def check_topic_access_permissions(user_id: int, topic_id: int):
     """
     Checks if the user has the necessary permissions to edit a topic.
     """
-    existing_topic = fetch_topic_by_id(topic_id)
-    if not existing_topic:
+    access_row = _topic_access_row(topic_id)
+    if not access_row:
         return False, f"Topic #ID:{topic_id} does not exist!"
 
-    if existing_topic.user_id != user_id:
+    owner_id, is_locked = access_row
+
+    if owner_id != user_id:
         return False, 'You are not allowed to edit this topic.'
 
-    if existing_topic.status == "closed":
+    if is_locked:
         return False, 'This topic is locked.'
 
     return True, 'OK'
@@ -221,6 +297,7 @@ def lock_or_unlock_topic(topic_id: int, lock_status: bool):
     """
     update_query('''UPDATE topics SET is_locked = ? WHERE topic_id = ?''',
                  (lock_status, topic_id))
+    invalidate(topic_id)
 
 
 #WORKS
@@ -249,23 +326,27 @@ def count_all_topics():
 def delete_topic(topic_id: int):
     """
     Deletes a topic by its ID.
-    First removes best_reply reference, then deletes replies, then the topic.
+    First removes best_reply reference, then deletes replies, then the topic, all in one transaction.
     """
     try:
-        update_query(
-            '''UPDATE topics SET best_reply_id = NULL WHERE topic_id = ?''', 
-            (topic_id,)
-        )
+        with transaction() as cursor:
+            cursor.execute(
+                '''UPDATE topics SET best_reply_id = NULL WHERE topic_id = ?''', 
+                (topic_id,)
+            )
 
-        update_query(
-            '''DELETE FROM replies WHERE topic_id = ?''', 
-            (topic_id,)
-        )
+            cursor.execute(
+                '''DELETE FROM replies WHERE topic_id = ?''', 
+                (topic_id,)
+            )
 
-        update_query(
-            '''DELETE FROM topics WHERE topic_id = ?''', 
-            (topic_id,)
-        )
+            cursor.execute(
+                '''DELETE FROM topics WHERE topic_id = ?''', 
+                (topic_id,)
+            )
+
+        invalidate(topic_id)
+        replies_services.invalidate()
 
         return f"Topic {topic_id} deleted successfully"
     except Exception as e:
@@ -283,4 +364,6 @@ def topic_create_form(title: str = Form(...), text: str = Form(...), category_id
 
 def remove_best_reply(reply_id: int):
 
-    update_query('''UPDATE topics SET best_reply_id = NULL WHERE best_reply_id = ?''', (reply_id,))
\ No newline at end of file
+    update_query('''UPDATE topics SET best_reply_id = NULL WHERE best_reply_id = ?''', (reply_id,))
+    # The reply is not tied to a topic ID here, so drop every cached topic
+    invalidate()
\ No newline at end of file
@@ -1,50 +1,81 @@
+from functools import partial
+from threading import Lock
+from cachetools import TTLCache, cached
+from cachetools.keys import hashkey
 from fastapi import Form
+from config import USER_CACHE_SIZE
 from common.exceptions import NotFoundException
 from data.models.user import User, UserRegistration, UserResponse, UserSearch
-from services import replies_services
-from data.database import read_query, insert_query, update_query
+from data.database import read_one, read_query, insert_query, update_query, query_count
 from data.models.vote import Vote
 import common.auth
 from mariadb import IntegrityError
 
 
+# Columns in the positional order UserResponse.from_query_result expects, only single-user lookups need the password hash
+USER_COLUMNS = 'user_id, username, password, email, first_name, last_name, is_admin'
+
+# Columns in the positional order UserResponse.from_rows expects, for queries that return many users
+USER_LIST_COLUMNS = 'user_id, username, email, first_name, last_name, is_admin'
+
+# Every authenticated request looks its user up, so lookups are kept for a short while.
+# Writes in this process drop them through invalidate_user()
+_user_cache = TTLCache(maxsize=USER_CACHE_SIZE, ttl=30)
+_user_cache_lock = Lock()
+
+
+def invalidate_user(username: str | None = None, user_id: int | None = None):
+    """Drops the cached lookups for a username and/or user ID, or every cached user if neither is given"""
+    with _user_cache_lock:
+        if username is None and user_id is None:
+            _user_cache.clear()
+            return
+        if username is not None:
+            _user_cache.pop(hashkey('get_user', username), None)
+        if user_id is not None:
+            _user_cache.pop(hashkey('get_user_by_id', user_id), None)
+            _user_cache.pop(hashkey('exists', user_id), None)
+
+
 def create_user(user: User) -> int:
-    return insert_query(
+    user_id = insert_query(
         'INSERT INTO users (username, password, email, first_name, last_name) VALUES (?, ?, ?, ?, ?)',
         (user.username, user.password, user.email, user.first_name, user.last_name)
     )
+    # A lookup made before the user existed may have cached a miss
+    invalidate_user(username=user.username, user_id=user_id)
+
+    return user_id
 
 
+@cached(_user_cache, key=partial(hashkey, 'get_user'), lock=_user_cache_lock)
 def get_user(username: str) -> UserResponse:
-    data = read_query(
-        '''SELECT user_id, username, password, email, first_name, 
-           last_name, is_admin, is_deleted, bio 
-           FROM users WHERE username = ? LIMIT 1''',
+    data = read_one(
+        f'SELECT {USER_COLUMNS}, is_deleted, bio FROM users WHERE username = ? LIMIT 1',
         (username,)
     )
     if not data:
         return None
         
     user_dict = {
-        'id': data[0][0],
-        'username': data[0][1],
-        'password': data[0][2],
-        'email': data[0][3],
-        'first_name': data[0][4],
-        'last_name': data[0][5],
-        'is_admin': bool(data[0][6]),
-        'is_deleted': bool(data[0][7]),
-        'bio': data[0][8]
+        'id': data[0],
+        'username': data[1],
+        'password': data[2],
+        'email': data[3],
+        'first_name': data[4],
+        'last_name': data[5],
+        'is_admin': bool(data[6]),
+        'is_deleted': bool(data[7]),
+        'bio': data[8]
     }
     
     return UserResponse(**user_dict)
 
+@cached(_user_cache, key=partial(hashkey, 'get_user_by_id'), lock=_user_cache_lock)
 def get_user_by_id(user_id: int) -> User | None:
     """Get user by ID with all fields including bio"""
-    data = read_query(
-        '''SELECT user_id as id, username, password, email, first_name, 
-           last_name, is_admin, is_deleted, bio 
-           FROM users WHERE user_id = ? LIMIT 1''',
+    data = read_one(
+        f'SELECT {USER_COLUMNS}, is_deleted, bio FROM users WHERE user_id = ? LIMIT 1',
         (user_id,)
     )
     
@@ -52,23 +83,27 @@ def get_user_by_id(user_id: int) -> User | None:
         return None
         
     user_dict = {
-        'id': data[0][0],
-        'username': data[0][1], 
-        'password': data[0][2],
-        'email': data[0][3],
-        'first_name': data[0][4],
-        'last_name': data[0][5],
-        'is_admin': bool(data[0][6]),
-        'is_deleted': bool(data[0][7]),
-        'bio': data[0][8]
+        'id': data[0],
+        'username': data[1], 
+        'password': data[2],
+        'email': data[3],
+        'first_name': data[4],
+        'last_name': data[5],
+        'is_admin': bool(data[6]),
+        'is_deleted': bool(data[7]),
+        'bio': data[8]
     }
     
     return User(**user_dict)
 
 
-def get_users():
-    data = read_query('SELECT * FROM users')
-    return [UserResponse.from_query_result(row) for row in data]
+def get_users(limit: int = 100, offset: int = 0) -> list[UserResponse]:
+    data = read_query(f'SELECT {USER_LIST_COLUMNS} FROM users ORDER BY user_id LIMIT ? OFFSET ?', (limit, offset))
+    return UserResponse.from_rows(data)
+
+
+def count_users() -> int:
+    return query_count('SELECT COUNT(*) FROM users')
     
 
 def has_voted(user_id: int, reply_id: int) -> Vote | None:
@@ -87,22 +122,51 @@ def has_voted(user_id: int, reply_id: int) -> Vote | None:
         NotFoundException: If the user or the reply does not exist.
     """
 
-    if not exists(user_id):
+    # One round trip for both existence checks and the vote, the LEFT JOIN always yields exactly one row
+    user_exists, reply_exists, vote_type = read_one(
+        '''SELECT EXISTS(SELECT 1 FROM users WHERE user_id = ?),
+                  EXISTS(SELECT 1 FROM replies WHERE reply_id = ?),
+                  v.type
+           FROM (SELECT 1) AS d
+           LEFT JOIN votes v ON v.user_id = ? AND v.reply_id = ?''',
+        (user_id, reply_id, user_id, reply_id))
+
+    if not user_exists:
         raise NotFoundException(detail='User does not exist')
 
-    if not replies_services.exists(reply_id):
+    if not reply_exists:
         raise NotFoundException(detail='Reply does not exist')
 
-    vote = read_query('''SELECT user_id, reply_id, type FROM votes WHERE user_id = ? AND reply_id = ? LIMIT 1''', (user_id, reply_id))
+    return Vote.from_query_result(user_id, reply_id, vote_type) if vote_type is not None else None
 
-    return next((Vote.from_query_result(*row) for row in vote), None)
 
+def has_voted_many(user_id: int, reply_ids: list[int]) -> dict[int, Vote]:
 
-def exists(user_id: int) -> bool:
+    """
+    Fetches a user's votes on several replies at once.
+
+    Args:
+        user_id (int): The ID of the user.
+        reply_ids (list[int]): The IDs of the replies.
 
-    user = read_query('''SELECT user_id FROM users WHERE user_id = ? LIMIT 1''', (user_id,))
+    Returns:
+        dict[int, Vote]: The user's votes keyed by reply ID, replies without a vote are left out.
+    """
 
-    return bool(user)
+    if not reply_ids:
+        return {}
+
+    placeholders = ', '.join('?' * len(reply_ids))
+    votes = read_query(f'''SELECT user_id, reply_id, type FROM votes WHERE user_id = ? AND reply_id IN ({placeholders})''',
+                       (user_id, *reply_ids))
+
+    return {row[1]: Vote.from_query_result(*row) for row in votes}
+
+
+@cached(_user_cache, key=partial(hashkey, 'exists'), lock=_user_cache_lock)
+def exists(user_id: int) -> bool:
+
+    return read_one('''SELECT 1 FROM users WHERE user_id = ? LIMIT 1''', (user_id,)) is not None
 
 
 def get_registration(username: str = Form(...), password: str = Form(...), confirm_password: str = Form(...), email: str = Form(...), first_name: str = Form(...), last_name: str = Form(...)):
@@ -131,14 +195,18 @@ def get_users_by_username(username: str, is_privileged: bool = False):
 
 
 def delete_user(user_id: int):
-    return insert_query('DELETE FROM users WHERE user_id = ?', (user_id,))
+    deleted = insert_query('DELETE FROM users WHERE user_id = ?', (user_id,))
+    # The user's username is not known here, so drop every cached user
+    invalidate_user()
+
+    return deleted
 
 
 def check_user_access_level(user_id: int, category_id: int) -> int:
-    data = read_query('SELECT write_access FROM users_categories_permissions WHERE user_id = ? AND category_id = ? LIMIT 1', (user_id, category_id))
+    data = read_one('SELECT write_access FROM users_categories_permissions WHERE user_id = ? AND category_id = ? LIMIT 1', (user_id, category_id))
     if not data:
         return 0
-    return data[0][0]
+    return data[0]
 
 
 def update_user_permissions(user_id: int, category_id: int, access_level: int):
@@ -174,4 +242,7 @@ def update_user_profile(user_id: int, email: str, first_name: str, last_name: st
                 (email, first_name, last_name, bio, user_id)
             )
     except IntegrityError:
-        raise ValueError("Email address already in use")
\ No newline at end of file
+        raise ValueError("Email address already in use")
+
+    # Cached users are also keyed by username, which is not known here
+    invalidate_user()
\ No newline at end of file
@@ -1,9 +1,11 @@
 from datetime import datetime, timedelta
+import time
 import unittest
 from unittest.mock import MagicMock, patch
 
 import pytest
-from common.auth import authenticate_user, create_access_token, get_current_admin_user, get_current_user, verify_password, get_password_hash, verify_token, token_blacklist
+from common import auth
+from common.auth import authenticate_user, create_access_token, get_current_admin_user, get_current_user, get_current_user_from_cookie, verify_password, get_password_hash, revoke_token, verify_token
 from common.exceptions import ForbiddenException, UnauthorizedException
 from config import ALGORITHM, SECRET_KEY
 from jose import jwt
@@ -35,10 +37,9 @@ class TestAuth(unittest.TestCase):
         self.assertTrue(hashed_password, password)
 
 
-    @patch('common.auth.datetime')
-    def test_create_access_token(self, mock_datetime):
-        mock_datetime.now.return_value = datetime(2024, 11, 4)
-        mock_datetime.timedelta = timedelta
+    @patch('common.auth.time')
+    def test_create_access_token(self, mock_time):
+        mock_time.time.return_value = datetime(2024, 11, 4).timestamp()
         data = {'sub': 'username'}
         expires_delta = timedelta(minutes=10)
         token = create_access_token(data, expires_delta=expires_delta)
@@ -47,14 +48,24 @@ class TestAuth(unittest.TestCase):
         self.assertEqual(data['sub'], decoded_token['sub'])
         self.assertIn('exp', decoded_token)
         self.assertIsInstance(decoded_token['exp'], int)
+        self.assertEqual(decoded_token['exp'], int(datetime(2024, 11, 4).timestamp()) + 600)
 
     @patch('common.auth.jwt.decode')
     def test_verify_token_valid(self, mock_jwt_decode):
-        mock_jwt_decode.return_value = {'sub': 'username'}
+        mock_jwt_decode.return_value = {'sub': 'username', 'exp': time.time() + 60}
         token = create_access_token({'sub': 'username'})
         result = verify_token(token)
         self.assertEqual(result['sub'], 'username')
 
+    @patch('common.auth.jwt.decode')
+    def test_verify_token_decodes_once_while_cached(self, mock_jwt_decode):
+        auth._token_cache.clear()
+        mock_jwt_decode.return_value = {'sub': 'username', 'exp': time.time() + 60}
+        verify_token('cached_token')
+        result = verify_token('cached_token')
+        self.assertEqual(result['sub'], 'username')
+        mock_jwt_decode.assert_called_once()
+
     def test_verify_token_invalid(self):
         token = create_access_token({'sub': 'username'})
         with self.assertRaises(UnauthorizedException):
@@ -62,15 +73,15 @@ class TestAuth(unittest.TestCase):
 
     def test_verify_token_revoked(self):
         token = create_access_token({'sub': 'username'})
-        token_blacklist.add(token)
+        revoke_token(token)
         with self.assertRaises(ForbiddenException):
             verify_token(token)
 
 
-    @patch('common.auth.read_query')
+    @patch('common.auth.read_one')
     @patch('common.auth.verify_password')
     def test_authenticate_user_success(self, mock_verify_password, mock_read_query):
-        mock_read_query.return_value = [(1, 'testuser', 'hashedpassword', 'test@example.com', 'First', 'Last', False)]
+        mock_read_query.return_value = (1, 'testuser', 'hashedpassword', 'test@example.com', 'First', 'Last', False)
         mock_verify_password.return_value = True
         mock_user_response = MagicMock(spec=UserResponse)
         mock_user_response.from_query_result.return_value = mock_user_response
@@ -82,11 +93,11 @@ class TestAuth(unittest.TestCase):
 
 
 
-    @patch('common.auth.read_query')
+    @patch('common.auth.read_one')
     @patch('common.auth.verify_password')
     def test_authenticate_user_invalid_password(self, mock_verify_password, mock_read_query):
         # Mock the database response
-        mock_user_data = [('test_user', 'test_email', 'hashed_password')]
+        mock_user_data = ('test_user', 'test_email', 'hashed_password')
         mock_read_query.return_value = mock_user_data
         mock_verify_password.return_value = False
 
@@ -94,10 +105,10 @@ class TestAuth(unittest.TestCase):
 
         self.assertIsNone(result)
                           
-    @patch('common.auth.read_query')
+    @patch('common.auth.read_one')
     def test_authenticate_user_no_user(self, mock_read_query):
         # Mock the database response
-        mock_read_query.return_value = []
+        mock_read_query.return_value = None
 
         result = authenticate_user('test_user', 'test_password')
 
@@ -153,6 +164,17 @@ class TestAuth(unittest.TestCase):
         mock_verify_token.assert_called_once_with(token)
         mock_get_user.assert_not_called()
 
+    @patch("common.auth.get_current_user")
+    def test_get_current_user_from_cookie(self, mock_get_current_user):
+        request = MagicMock(cookies={'token': 'valid_token'})
+        user = UserResponse(id=1, username='testuser', email='test@example.com', first_name='Test', last_name='User', is_admin=False)
+        mock_get_current_user.return_value = user
+
+        result = get_current_user_from_cookie(request)
+
+        self.assertEqual(result, user)
+        mock_get_current_user.assert_called_once_with('valid_token')
+
     # Test get_current_admin_user
     @patch("common.auth.get_current_user")
     def test_get_current_admin_user(self, mock_get_current_user):
@@ -18,26 +18,27 @@ class TestCategoryServices(TestCase):
                               'george', 'jones', DATE, True, False)
         self.testcategory1 = mock_category(1, 'Electronics', False, False)
         self.testcategory2 = mock_category(2, 'Clothes', False, False)
+        categories_services.invalidate()
 
     @patch('services.categories_services.read_query', autospec=True)
-    def testGetCategories_NoCategories_ReturnsNone(self, mock_read_query):
+    def testGetCategories_NoCategories_ReturnsEmptyList(self, mock_read_query):
         mock_read_query.return_value = []
         result = categories_services.get_categories(current_user=self.testuser1)
-        expected = None
+        expected = []
         self.assertEqual(result, expected)
         
     @patch('services.categories_services.read_query', autospec=True)
-    def testGetCategories_NoMatchingIDs_ReturnsNone(self, mock_read_query):
+    def testGetCategories_NoMatchingIDs_ReturnsEmptyList(self, mock_read_query):
         mock_read_query.return_value = []
         result = categories_services.get_categories(current_user=self.testuser1, category_id=1)
-        expected = None
+        expected = []
         self.assertEqual(result, expected)
 
     @patch('services.categories_services.read_query', autospec=True)
-    def testGetCategories_OneMatchingCategory_ReturnsCategoryResponse(self, mock_read_query):
+    def testGetCategories_OneMatchingCategory_ReturnsListWithCategoryResponse(self, mock_read_query):
         mock_read_query.return_value = [(1, 'Electronics')]
         result = categories_services.get_categories(current_user=self.testuser1, category_id=1)
-        expected = CategoryResponse(id=1, name='Electronics')
+        expected = [CategoryResponse(id=1, name='Electronics')]
         self.assertEqual(result, expected)
 
     @patch('services.categories_services.read_query', autospec=True)
@@ -47,6 +48,14 @@ class TestCategoryServices(TestCase):
         expected = [CategoryResponse(id=1, name='Electronics'), CategoryResponse(id=2, name='Clothes')]
         self.assertEqual(result, expected)
 
+    @patch('services.categories_services.read_query', autospec=True)
+    def testGetCategories_AdminFilterByID_FiltersInWhereClause(self, mock_read_query):
+        mock_read_query.return_value = []
+        categories_services.get_categories(current_user=self.testadmin1, category_id=1)
+        query, params = mock_read_query.call_args[0]
+        self.assertIn('WHERE 1=1 AND c.category_id = ?', query)
+        self.assertEqual(params, (1, 10, 0))
+
     @patch('services.categories_services.exists', autospec=True)
     def testCreate_CategoryExists_RaisesException(self, mock_exists):
         mock_exists.return_value = True
@@ -82,25 +91,28 @@ class TestCategoryServices(TestCase):
         with self.assertRaises(NotFoundException):
             categories_services.delete(1)
 
-    @patch('services.categories_services.update_query', autospec=True)
+    @patch('services.categories_services.transaction')
     @patch('services.categories_services.exists', autospec=True)
-    def testDelete_CategoryExistsNoTopics_ReturnsResponse(self, mock_exists, mock_update_query):
+    @patch('services.categories_services.has_topics', autospec=True)
+    def testDelete_CategoryExistsNoTopics_ReturnsResponse(self, mock_has_topics, mock_exists, mock_transaction):
         mock_exists.return_value = True
-        mock_update_query.return_value = 1
+        mock_has_topics.return_value = False
         result = categories_services.delete(1)
         excepted = 'only category deleted'
         self.assertEqual(result, excepted)
+        self.assertEqual(mock_transaction.return_value.__enter__.return_value.execute.call_count, 2)
 
-    @patch('services.categories_services.update_query', autospec=True)
+    @patch('services.categories_services.transaction')
     @patch('services.categories_services.exists', autospec=True)
     @patch('services.categories_services.has_topics', autospec=True)
-    def testDelete_CategoryExistsWithTopics_ReturnsResponse(self, mock_has_topics, mock_exists, mock_update_query):
+    def testDelete_CategoryExistsWithTopics_ReturnsResponse(self, mock_has_topics, mock_exists, mock_transaction):
         mock_exists.return_value = True
         mock_has_topics.return_value = True
-        mock_update_query.return_value = 2
         result = categories_services.delete(1, True)
         excepted = 'everything deleted'
         self.assertEqual(result, excepted)
+        self.assertEqual(mock_transaction.return_value.__enter__.return_value.execute.call_count, 5)
+        mock_transaction.assert_called_once()
 
     @patch('services.categories_services.update_query', autospec=True)
     @patch('services.categories_services.exists', autospec=True)
@@ -146,6 +158,23 @@ class TestCategoryServices(TestCase):
         result = categories_services.get_name(1)
         self.assertEqual(result, 'Electronics')
     
+    @patch('services.categories_services.read_query', autospec=True)
+    def testGetName_RepeatedCalls_QueriesOnce(self, mock_read_query):
+        mock_read_query.return_value = [('Electronics',)]
+        categories_services.get_name(1)
+        result = categories_services.get_name(1)
+        self.assertEqual(result, 'Electronics')
+        mock_read_query.assert_called_once()
+
+    @patch('services.categories_services.update_query', autospec=True)
+    @patch('services.categories_services.read_query', autospec=True)
+    def testLockUnlock_InvalidatesCachedLockState(self, mock_read_query, mock_update_query):
+        mock_read_query.side_effect = [[(1,)], [(False,)], [(True,)]]
+        mock_update_query.return_value = 1
+        categories_services.lock_unlock(1)
+        result = categories_services.is_locked(1)
+        self.assertTrue(result)
+
     @patch('services.categories_services.get_id', autospec=True)
     def testGetId_CategoryExists_ReturnsID(self, mock_get_id):
         mock_get_id.return_value = 1
@@ -0,0 +1,35 @@
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+from mariadb import PoolError
+from data import database
+
+
+class TestDatabase(TestCase):
+
+    def setUp(self):
+        self.pool = MagicMock()
+        patcher = patch('data.database._pool', self.pool)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def testGetConnection_PoolHasConnection_ReturnsIt(self):
+        conn = MagicMock()
+        self.pool.get_connection.return_value = conn
+        self.assertIs(database._get_connection(), conn)
+        self.pool.get_connection.assert_called_once()
+
+    @patch('data.database.time.sleep')
+    def testGetConnection_PoolBusy_WaitsForFreeConnection(self, mock_sleep):
+        conn = MagicMock()
+        self.pool.get_connection.side_effect = [PoolError('busy'), None, conn]
+        self.assertIs(database._get_connection(), conn)
+        self.assertEqual(self.pool.get_connection.call_count, 3)
+        self.assertEqual(mock_sleep.call_count, 2)
+
+    @patch('data.database.DB_POOL_TIMEOUT', 0)
+    @patch('data.database.time.sleep')
+    def testGetConnection_PoolExhausted_RaisesInsteadOfConnectingDirectly(self, mock_sleep):
+        self.pool.get_connection.side_effect = PoolError('busy')
+        with self.assertRaises(PoolError), self.assertLogs('data.database', level='WARNING'):
+            database._get_connection()
+        mock_sleep.assert_not_called()
@@ -19,29 +19,47 @@ class TestReplyServices(TestCase):
                                     'george', 'jones', DATE, True, False)
         self.testreply1 = mock_reply(1, 'This is a reply', 1, 1, DATE, False)
         self.testreply2 = mock_reply(1,'This is another reply', 2, 2, DATE, False)
+        replies_services.invalidate()
     
-    @patch('services.replies_services.read_query')
-    def testGetReplies_NoRepliesFound_ReturnsNone(self, mock_read_query):
+    @patch('services.replies_services.read_dict_query')
+    def testGetReplies_NoRepliesFound_ReturnsEmptyList(self, mock_read_query):
         mock_read_query.return_value = []
         result = replies_services.get_replies()
-        self.assertIsNone(result)
+        self.assertEqual(result, [])
 
-    @patch('services.replies_services.read_query')
-    def testGetReplies_OneReplyFound_ReturnsReply(self, mock_read_query):
-        mock_read_query.return_value = [(1, 'This is a reply', 1, 1, DATE, False)]
+    @patch('services.replies_services.read_dict_query')
+    def testGetReplies_OneReplyFound_ReturnsListWithReply(self, mock_read_query):
+        mock_read_query.return_value = [{'reply_id': 1, 'text': 'This is a reply', 'user_id': 1, 'topic_id': 1, 'created': DATE, 'edited': 0}]
         result = replies_services.get_replies()
-        expected = Reply(id=1, text='This is a reply', user_id=1, topic_id=1, created=DATE, edited=False)
+        expected = [Reply(id=1, text='This is a reply', user_id=1, topic_id=1, created=DATE, edited=False)]
         self.assertEqual(result, expected)
 
-    @patch('services.replies_services.read_query')
+    @patch('services.replies_services.read_dict_query')
     def testGetReplies_MultipleRepliesFound_ReturnsList(self, mock_read_query):
-        mock_read_query.return_value = [(1, 'This is a reply', 1, 1, DATE, False),
-                                        (2, 'This is another reply', 2, 2, DATE, False)]
+        mock_read_query.return_value = [{'reply_id': 1, 'text': 'This is a reply', 'user_id': 1, 'topic_id': 1, 'created': DATE, 'edited': 0},
+                                        {'reply_id': 2, 'text': 'This is another reply', 'user_id': 2, 'topic_id': 2, 'created': DATE, 'edited': 0}]
         result = replies_services.get_replies()
         expected = [Reply(id=1, text='This is a reply', user_id=1, topic_id=1, created=DATE, edited=False),
                     Reply(id=2, text='This is another reply', user_id=2, topic_id=2, created=DATE, edited=False)]
         self.assertEqual(result, expected)
 
+    @patch('services.replies_services.read_dict_query')
+    def testGetReplies_FilterByUserName_IssuesSingleJoinedQuery(self, mock_read_query):
+        mock_read_query.return_value = []
+        replies_services.get_replies(user_name='john', sort_by='created', sort='desc')
+        mock_read_query.assert_called_once()
+        query, params = mock_read_query.call_args[0]
+        self.assertIn('JOIN users u', query)
+        self.assertIn('ORDER BY r.created DESC', query)
+        self.assertEqual(params, ('john', 10, 0))
+
+    @patch('services.replies_services.read_dict_query')
+    def testGetReplies_UnknownSortColumn_IsIgnored(self, mock_read_query):
+        mock_read_query.return_value = []
+        replies_services.get_replies(sort_by='reply_id; DROP TABLE replies')
+        query, _ = mock_read_query.call_args[0]
+        self.assertNotIn('ORDER BY', query)
+
     @patch('services.replies_services.read_query')
     def testCreate_NoTopic_RaisesException(self, mock_read_query):
         mock_read_query.return_value = []
@@ -58,6 +76,19 @@ class TestReplyServices(TestCase):
         expected = Reply(id=1, text='This is another reply', user_id=1, topic_id=1, created=DATE, edited=False)
         self.assertEqual(result, expected)
 
+    @patch('services.replies_services.read_query')
+    @patch('services.replies_services.insert_query')
+    @patch('services.replies_services.read_dict_query')
+    def testCreate_EvictsMissingReplyFromCache(self, mock_read_dict_query, mock_insert_query, mock_read_query):
+        mock_read_dict_query.return_value = []
+        self.assertIsNone(replies_services.get_reply_by_id(1))
+        mock_read_query.return_value = [(1,)]
+        mock_insert_query.return_value = 1
+        replies_services.create(Reply(text='This is a reply', user_id=1, topic_id=1, created=DATE, edited=False), self.testuser1)
+        mock_read_dict_query.return_value = [{'reply_id': 1, 'text': 'This is a reply', 'user_id': 1, 'topic_id': 1, 'created': DATE, 'edited': 0}]
+        result = replies_services.get_reply_by_id(1)
+        self.assertEqual(result.id, 1)
+
     @patch('services.replies_services.exists')
     def testEditText_ReplyNotFound_RaisesException(self, mock_exists):
         mock_exists.return_value = False
@@ -128,6 +159,19 @@ class TestReplyServices(TestCase):
         result = replies_services.delete(1, self.testadmin1)
         self.assertEqual(result, 'reply deleted')
 
+    @patch('services.replies_services.exists')
+    @patch('services.replies_services.read_query')
+    @patch('services.replies_services.update_query')
+    @patch('services.replies_services.read_dict_query')
+    def testDelete_EvictsReplyCachedByKeyword(self, mock_read_dict_query, mock_update_query, mock_read_query, mock_exists):
+        mock_read_dict_query.return_value = [{'reply_id': 1, 'text': 'This is a reply', 'user_id': 1, 'topic_id': 1, 'created': DATE, 'edited': 0}]
+        mock_exists.return_value = True
+        mock_read_query.return_value = [('john',)]
+        replies_services.get_reply_by_id(reply_id=1)
+        replies_services.delete(1, self.testadmin1)
+        replies_services.get_reply_by_id(reply_id=1)
+        self.assertEqual(mock_read_dict_query.call_count, 2)
+
     @patch('services.replies_services.read_query')
     def testFetchText_ReturnsText(self, mock_read_query):
         mock_read_query.return_value = [('This is a reply',)]
@@ -1,5 +1,6 @@
 from unittest import TestCase
-from unittest.mock import patch
+from unittest.mock import Mock, patch
+from datetime import datetime
 from data.models.topic import TopicResponse, TopicCreate
 from services import topics_services as topics
 
@@ -26,14 +27,23 @@ def create_topic(topic_id, topic_title=TITLE, author=AUTHOR):
         category_id=CATEGORY_ID,
         category_name=CATEGORY_NAME)
 
+
+def topic_row(**reply_columns):
+    return {'topic_id': TOPIC_ID, 'title': TITLE, 'author_id': USER_ID, 'username': AUTHOR,
+            'is_locked': STATUS_OPEN, 'best_reply_id': BEST_REPLY_ID, 'category_id': CATEGORY_ID,
+            'category_name': CATEGORY_NAME, **reply_columns}
+
   
 class TopicsServices_Should(TestCase):
+
+    def setUp(self):
+        topics.invalidate()
    
     def test_getById_returnsTopicResponseObject_whenExists(self):
-        with patch('services.topics_services.read_query') as mock_read_query:
-            mock_read_query.return_value = [
-                (TOPIC_ID, TITLE, USER_ID, AUTHOR, STATUS_OPEN, BEST_REPLY_ID, CATEGORY_ID, CATEGORY_NAME)
-            ]
+        with patch('services.topics_services.read_one') as mock_read_one:
+            mock_read_one.return_value = (
+                TOPIC_ID, TITLE, USER_ID, AUTHOR, STATUS_OPEN, BEST_REPLY_ID, CATEGORY_ID, CATEGORY_NAME
+            )
 
             expected = create_topic(TOPIC_ID)
             
@@ -43,9 +53,9 @@ class TopicsServices_Should(TestCase):
     
     
     def test_getById_returnsNone_whenNoSuchTopic(self):
-        with patch('services.topics_services.read_query') as mock_read_query:
+        with patch('services.topics_services.read_one') as mock_read_one:
             topic_id = 1
-            mock_read_query.return_value = []
+            mock_read_one.return_value = None
 
             expected = None
             result = topics.fetch_topic_by_id(topic_id)
@@ -53,6 +63,60 @@ class TopicsServices_Should(TestCase):
             self.assertEqual(expected, result)
           
         
+    def test_getWithReplies_returnsTopicAndReplies_inOneQuery(self):
+        with patch('services.topics_services.read_dict_query') as mock_read_dict_query:
+            created = datetime(2024, 10, 28, 10, 30)
+            mock_read_dict_query.return_value = [
+                topic_row(reply_id=1, text='first reply', user_id=USER_ID, created=created, edited=0),
+                topic_row(reply_id=2, text='second reply', user_id=USER_ID, created=created, edited=0)
+            ]
+
+            topic, replies = topics.fetch_topic_with_replies(TOPIC_ID)
+
+            self.assertEqual(create_topic(TOPIC_ID), topic)
+            self.assertEqual([1, 2], [reply.id for reply in replies])
+            self.assertEqual([TOPIC_ID, TOPIC_ID], [reply.topic_id for reply in replies])
+            mock_read_dict_query.assert_called_once()
+
+
+    def test_getWithReplies_returnsEmptyReplies_whenTopicHasNone(self):
+        with patch('services.topics_services.read_dict_query') as mock_read_dict_query:
+            mock_read_dict_query.return_value = [
+                topic_row(reply_id=None, text=None, user_id=None, created=None, edited=None)
+            ]
+
+            topic, replies = topics.fetch_topic_with_replies(TOPIC_ID)
+
+            self.assertEqual(create_topic(TOPIC_ID), topic)
+            self.assertEqual([], replies)
+
+
+    def test_fetchAll_readsTotalCount_fromWindowColumn(self):
+        with patch('services.topics_services.read_query') as mock_read_query:
+            mock_read_query.return_value = [
+                (TOPIC_ID, TITLE, USER_ID, AUTHOR, STATUS_OPEN, BEST_REPLY_ID, CATEGORY_ID, CATEGORY_NAME, 25)
+            ]
+
+            result = topics.fetch_all_topics(per_page=10, current_user=Mock(id=USER_ID, is_admin=True))
+
+            self.assertEqual([create_topic(TOPIC_ID)], result['topics'])
+            self.assertEqual(25, result['total_count'])
+            self.assertEqual(3, result['total_pages'])
+            mock_read_query.assert_called_once()
+
+
+    def test_fetchAll_checksPrivateCategoryAccess_withExists(self):
+        with patch('services.topics_services.read_query') as mock_read_query:
+            mock_read_query.return_value = []
+
+            topics.fetch_all_topics(per_page=10, current_user=Mock(id=USER_ID, is_admin=False))
+
+            sql, params = mock_read_query.call_args.args
+            self.assertNotIn('DISTINCT', sql)
+            self.assertIn('EXISTS (SELECT 1 FROM users_categories_permissions', sql)
+            self.assertEqual((USER_ID, 10, 0), params)
+
+
     def test_exists_returns_True_when_topicIsPresent(self):
         with patch('services.topics_services.read_query') as mock_read_query:
             mock_read_query.return_value = [(1)]
@@ -71,6 +135,83 @@ class TopicsServices_Should(TestCase):
             self.assertFalse(result)
             
               
+    def test_exists_queriesOnce_forRepeatedCalls(self):
+        with patch('services.topics_services.read_query') as mock_read_query:
+            mock_read_query.return_value = [(1,)]
+
+            topics.exists(TOPIC_ID)
+            result = topics.exists(TOPIC_ID)
+
+            self.assertTrue(result)
+            mock_read_query.assert_called_once_with(
+                '''SELECT 1 FROM topics WHERE topic_id = ? LIMIT 1''', (TOPIC_ID,)
+            )
+
+
+    def test_updateTitle_evictsCachedTopic(self):
+        with patch('services.topics_services.read_one') as mock_read_one, \
+             patch('services.topics_services.update_query'):
+            mock_read_one.return_value = (
+                TOPIC_ID, TITLE, USER_ID, AUTHOR, STATUS_OPEN, BEST_REPLY_ID, CATEGORY_ID, CATEGORY_NAME
+            )
+
+            topics.fetch_topic_by_id(TOPIC_ID)
+            topics.update_topic_title(TOPIC_ID, 'New title')
+            topics.fetch_topic_by_id(TOPIC_ID)
+
+            self.assertEqual(2, mock_read_one.call_count)
+
+
+    def test_checkAccess_returnsFalse_whenNoSuchTopic(self):
+        with patch('services.topics_services.read_one') as mock_read_one:
+            mock_read_one.return_value = None
+
+            result = topics.check_topic_access_permissions(USER_ID, TOPIC_ID)
+
+            self.assertEqual((False, f"Topic #ID:{TOPIC_ID} does not exist!"), result)
+
+
+    def test_checkAccess_returnsFalse_whenUserIsNotOwner(self):
+        with patch('services.topics_services.read_one') as mock_read_one:
+            mock_read_one.return_value = (USER_ID + 1, STATUS_OPEN)
+
+            result = topics.check_topic_access_permissions(USER_ID, TOPIC_ID)
+
+            self.assertEqual((False, 'You are not allowed to edit this topic.'), result)
+
+
+    def test_checkAccess_returnsFalse_whenTopicLocked(self):
+        with patch('services.topics_services.read_one') as mock_read_one:
+            mock_read_one.return_value = (USER_ID, 1)
+
+            result = topics.check_topic_access_permissions(USER_ID, TOPIC_ID)
+
+            self.assertEqual((False, 'This topic is locked.'), result)
+
+
+    def test_checkAccess_returnsTrue_whenOwnerAndOpen(self):
+        with patch('services.topics_services.read_one') as mock_read_one:
+            mock_read_one.return_value = (USER_ID, STATUS_OPEN)
+
+            result = topics.check_topic_access_permissions(USER_ID, TOPIC_ID)
+
+            self.assertEqual((True, 'OK'), result)
+
+
+    def test_checkAccess_seesLock_afterLockOrUnlock(self):
+        with patch('services.topics_services.read_one') as mock_read_one, \
+             patch('services.topics_services.update_query'):
+            mock_read_one.return_value = (USER_ID, STATUS_OPEN)
+            topics.check_topic_access_permissions(USER_ID, TOPIC_ID)
+
+            topics.lock_or_unlock_topic(TOPIC_ID, True)
+            mock_read_one.return_value = (USER_ID, 1)
+
+            result = topics.check_topic_access_permissions(USER_ID, TOPIC_ID)
+
+            self.assertEqual((False, 'This topic is locked.'), result)
+
+
     def test_create_returnsTrue(self):
         with patch('services.topics_services.insert_query') as mock_insert_query:
             topic_id = 1
@@ -118,23 +118,19 @@ class TopicsRouter_Should(TestCase):
                 self.assertEqual('Topic #ID:1 does not exist', ex.exception.detail)
 
     def test_getTopicById_raisesHTTPException_whenCategoryPrivate_userNoPermission(self):
-        # Mock the fetch_topic_by_id service
-        with patch('services.topics_services.fetch_topic_by_id') as mock_fetch_topic:
-            # Create a fake private topic
+        # Mock the fetch_topic_with_replies service, the router loads the topic and its replies through it
+        with patch('services.topics_services.fetch_topic_with_replies') as mock_fetch_topic:
+            # Create a fake private topic without replies
             private_topic = fake_topic(is_private=True)
-            mock_fetch_topic.return_value = private_topic
+            mock_fetch_topic.return_value = (private_topic, [])
 
-            # Mock the fetch_replies_for_topic service (if needed for completeness)
-            with patch('services.topics_services.fetch_replies_for_topic') as mock_fetch_replies:
-                mock_fetch_replies.return_value = []  # Assuming no replies for simplicity
-
-                # Now, simulate the request and check for the exception
-                with self.assertRaises(HTTPException) as ex:
-                    topics_router.get_topic_by_id(TestTopic.ID)  # Only pass topic_id
+            # Now, simulate the request and check for the exception
+            with self.assertRaises(HTTPException) as ex:
+                topics_router.get_topic_by_id(TestTopic.ID)  # Only pass topic_id
 
-                # Check if the exception raised is the one we expect
-                self.assertEqual(401, ex.exception.status_code)
-                self.assertEqual('Login to view topics in private categories', ex.exception.detail)
+            # Check if the exception raised is the one we expect
+            self.assertEqual(401, ex.exception.status_code)
+            self.assertEqual('Login to view topics in private categories', ex.exception.detail)
 
 
     def test_createTopic_returnsCorrectMsg_whenCategoryExistsAndUserHasAccess(self):
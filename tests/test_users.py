@@ -2,13 +2,18 @@
 import unittest
 from unittest.mock import patch
 from data.models.user import User, UserResponse
-from services.users_services import create_user, get_user, get_users
+from common.exceptions import NotFoundException
+from data.models.vote import Vote
+from services.users_services import USER_COLUMNS, USER_LIST_COLUMNS, create_user, get_user, get_users, has_voted, has_voted_many, invalidate_user
 
 
        
 
 class TestUserServices(unittest.TestCase):
 
+    def setUp(self):
+        invalidate_user()
+
     @patch('services.users_services.insert_query')
     def test_create_user(self, mock_insert_query):
         user = User(username='testuser', password='password', email='test@example.com', first_name='Test', last_name='User')
@@ -20,32 +25,78 @@ class TestUserServices(unittest.TestCase):
             ('testuser', 'password', 'test@example.com', 'Test', 'User')
         )
 
-    @patch('services.users_services.read_query')
+    @patch('services.users_services.read_one')
     def test_get_user(self, mock_read_query):
-        mock_read_query.return_value = [(1,'testuser', 'hashed_password', 'test@example.com', 'Test', 'User', False)]
+        mock_read_query.return_value = (1,'testuser', 'hashed_password', 'test@example.com', 'Test', 'User', False, False, None)
         user_response = get_user('testuser')
         self.assertIsInstance(user_response, UserResponse)
         self.assertEqual(user_response.username, 'testuser')
         self.assertFalse(user_response.is_admin)
-        mock_read_query.assert_called_once_with('SELECT * FROM users WHERE username=?', ('testuser',))
+        mock_read_query.assert_called_once_with(f'SELECT {USER_COLUMNS}, is_deleted, bio FROM users WHERE username = ? LIMIT 1', ('testuser',))
 
-    @patch('services.users_services.read_query')
+    @patch('services.users_services.read_one')
     def test_get_user_not_found(self, mock_read_query):
-        mock_read_query.return_value = []
+        mock_read_query.return_value = None
         user_response = get_user('testuser')
         self.assertIsNone(user_response)
-        mock_read_query.assert_called_once_with('SELECT * FROM users WHERE username=?', ('testuser',))
+        mock_read_query.assert_called_once_with(f'SELECT {USER_COLUMNS}, is_deleted, bio FROM users WHERE username = ? LIMIT 1', ('testuser',))
 
 
     @patch('services.users_services.read_query')
     def test_get_users(self, mock_read_query):
         mock_read_query.return_value = [
-            (1, 'testuser1', 'hashed_password', 'test1@example.com', 'Test1', 'User1', False),
-            (2, 'testuser2', 'hashed_password', 'test2@example.com', 'Test2', 'User2', False)
+            (1, 'testuser1', 'test1@example.com', 'Test1', 'User1', False),
+            (2, 'testuser2', 'test2@example.com', 'Test2', 'User2', False)
             ]
         users = get_users()  
         self.assertIsInstance(users[0], UserResponse)
         self.assertEqual(len(users), 2)
         self.assertEqual(users[0].username, 'testuser1')
         self.assertEqual(users[1].username, 'testuser2')
-        mock_read_query.assert_called_once_with('SELECT * FROM users')     
\ No newline at end of file
+        self.assertEqual(users[0].email, 'test1@example.com')
+        self.assertNotIn('password', USER_LIST_COLUMNS)
+        mock_read_query.assert_called_once_with(f'SELECT {USER_LIST_COLUMNS} FROM users ORDER BY user_id LIMIT ? OFFSET ?', (100, 0))     
+
+    @patch('services.users_services.read_one')
+    def test_get_user_repeated_calls_query_once(self, mock_read_query):
+        mock_read_query.return_value = (1, 'testuser', 'hashed_password', 'test@example.com', 'Test', 'User', False, False, None)
+        get_user('testuser')
+        user_response = get_user('testuser')
+        self.assertEqual(user_response.username, 'testuser')
+        mock_read_query.assert_called_once()
+
+    @patch('services.users_services.insert_query')
+    @patch('services.users_services.read_one')
+    def test_create_user_evicts_cached_miss(self, mock_read_query, mock_insert_query):
+        mock_read_query.return_value = None
+        mock_insert_query.return_value = 1
+        self.assertIsNone(get_user('testuser'))
+        create_user(User(username='testuser', password='password', email='test@example.com', first_name='Test', last_name='User'))
+        get_user('testuser')
+        self.assertEqual(mock_read_query.call_count, 2)
+
+    @patch('services.users_services.read_one')
+    def test_has_voted_returns_vote_from_single_query(self, mock_read_query):
+        mock_read_query.return_value = (1, 1, 1)
+        vote = has_voted(user_id=1, reply_id=2)
+        self.assertEqual(vote, Vote(user_id=1, reply_id=2, type=True))
+        mock_read_query.assert_called_once()
+
+    @patch('services.users_services.read_one')
+    def test_has_voted_missing_reply_raises(self, mock_read_query):
+        mock_read_query.return_value = (1, 0, None)
+        with self.assertRaises(NotFoundException):
+            has_voted(user_id=1, reply_id=2)
+
+    @patch('services.users_services.read_query')
+    def test_has_voted_many_returns_votes_by_reply_id(self, mock_read_query):
+        mock_read_query.return_value = [(1, 2, 1), (1, 4, 0)]
+        votes = has_voted_many(user_id=1, reply_ids=[2, 3, 4])
+        self.assertEqual(votes, {2: Vote(user_id=1, reply_id=2, type=True), 4: Vote(user_id=1, reply_id=4, type=False)})
+        mock_read_query.assert_called_once_with(
+            '''SELECT user_id, reply_id, type FROM votes WHERE user_id = ? AND reply_id IN (?, ?, ?)''', (1, 2, 3, 4))
+
+    @patch('services.users_services.read_query')
+    def test_has_voted_many_no_replies_skips_query(self, mock_read_query):
+        self.assertEqual(has_voted_many(user_id=1, reply_ids=[]), {})
+        mock_read_query.assert_not_called()